@@ -0,0 +1,60 @@
+"""Messages/sec of filter text normalization, before and after the translate-table normalizer.
+
+Run from the repository root: python -m benchmarks.bench_normalizer
+"""
+import random
+import re
+import string
+import time
+import unicodedata
+
+from utils.text_normalizer import normalize
+
+MESSAGES = 20000
+
+def legacy_normalize(text: str) -> str:
+    """The original EnhancedWordFilter.normalize_text, kept as the baseline"""
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode()
+    leetspeak = {
+        '4': 'a', '@': 'a', '8': 'b', '3': 'e', '1': 'i', '0': 'o',
+        '5': 's', '7': 't', '2': 'z', '9': 'g', '6': 'g'
+    }
+    for k, v in leetspeak.items():
+        text = text.replace(k, v)
+    text = re.sub(r'(.)\1+', r'\1', text)
+    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
+    return text.lower()
+
+def make_messages(count: int, ascii_only: bool = False):
+    rng = random.Random(42)
+    alphabet = string.ascii_letters + string.digits + '  .,!?@'
+    if not ascii_only:
+        alphabet += 'éäöüаеорс\u200b'
+    return [
+        ''.join(rng.choice(alphabet) for _ in range(rng.randint(20, 200)))
+        for _ in range(count)
+    ]
+
+def run(label: str, fn, messages):
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {len(messages) / elapsed:>12,.0f} msgs/sec")
+
+def main():
+    plain = make_messages(MESSAGES, ascii_only=True)
+    unique = make_messages(MESSAGES)
+    # Spam waves repeat the same few messages over and over
+    spam = [unique[i % 50] for i in range(MESSAGES)]
+
+    run("legacy (ASCII messages)", legacy_normalize, plain)
+    run("translate (ASCII messages)", normalize.__wrapped__, plain)
+    run("legacy (mixed-script messages)", legacy_normalize, unique)
+    run("translate (mixed-script messages)", normalize.__wrapped__, unique)
+    run("legacy (repeated spam)", legacy_normalize, spam)
+    normalize.cache_clear()
+    run("translate + LRU (repeated spam)", normalize, spam)
+
+if __name__ == "__main__":
+    main()
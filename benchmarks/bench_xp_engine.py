@@ -0,0 +1,76 @@
+"""Sustained messages/sec through XPEngine, and how big its cooldown map gets.
+
+Run from the repository root: python -m benchmarks.bench_xp_engine
+"""
+import random
+import time
+
+from utils.xp_engine import LEVEL_THRESHOLDS, XPEngine, advance_level, level_for_xp
+
+MESSAGES = 1_000_000
+GUILDS = 50
+USERS = 200_000
+# Simulated traffic: 2,000 messages per second of bot time
+MESSAGE_RATE = 2000
+FLUSH_EVERY = 10.0
+
+def main():
+    rng = random.Random(42)
+    engine = XPEngine(rng=random.Random(1))
+    # Half the traffic comes from a few very active users, half from a long tail
+    authors = [
+        (rng.randrange(GUILDS),
+         int(rng.paretovariate(1.2)) % USERS if rng.random() < 0.5 else rng.randrange(USERS))
+        for _ in range(MESSAGES)
+    ]
+
+    totals = {}
+    levels = {}
+    level_ups = 0
+    peak_cooldowns = 0
+    flush_seconds = 0.0
+    next_flush = FLUSH_EVERY
+
+    start = time.perf_counter()
+    for i, (guild_id, user_id) in enumerate(authors):
+        now = i / MESSAGE_RATE
+        engine.award(guild_id, user_id, now=now)
+        if now >= next_flush:
+            flush_start = time.perf_counter()
+            # Stands in for the UPSERT: apply deltas and detect level-ups
+            for key, entry in engine.drain().items():
+                xp = totals[key] = totals.get(key, 0) + entry.xp
+                level = advance_level(levels.get(key, 0), xp)
+                if level != levels.get(key, 0):
+                    level_ups += 1
+                    levels[key] = level
+            flush_seconds += time.perf_counter() - flush_start
+            next_flush += FLUSH_EVERY
+            peak_cooldowns = max(peak_cooldowns, engine.stats()['cooldown_entries'])
+    elapsed = time.perf_counter() - start
+
+    stats = engine.stats()
+    print(f"{'messages':<28} {MESSAGES:>12,}")
+    print(f"{'XP awards':<28} {stats['awards']:>12,}")
+    print(f"{'level-ups':<28} {level_ups:>12,}")
+    print(f"{'throughput':<28} {MESSAGES / elapsed:>12,.0f} msgs/sec")
+    print(f"{'time in flushes':<28} {flush_seconds / elapsed:>12.1%}")
+    print(f"{'peak cooldown entries':<28} {peak_cooldowns:>12,}")
+    print(f"{'distinct authors':<28} {len(set(authors)):>12,}")
+
+    # Level lookups: curve bisection vs stepping from a known level
+    samples = [rng.randrange(LEVEL_THRESHOLDS[200]) for _ in range(200_000)]
+    start = time.perf_counter()
+    for xp in samples:
+        level_for_xp(xp)
+    bisect_rate = len(samples) / (time.perf_counter() - start)
+    known = [level_for_xp(xp) for xp in samples]
+    start = time.perf_counter()
+    for level, xp in zip(known, samples):
+        advance_level(level, xp + 20)
+    step_rate = len(samples) / (time.perf_counter() - start)
+    print(f"{'level_for_xp (bisect)':<28} {bisect_rate:>12,.0f} lookups/sec")
+    print(f"{'advance_level (+20 XP)':<28} {step_rate:>12,.0f} lookups/sec")
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,17 @@ import discord
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
-import asyncpg
 import ssl
 import logging
 import sys
+import time
 import traceback
 from pathlib import Path
+from utils.command_sync import sync_if_changed
+from utils.db_manager import DatabaseManager
+from utils.guild_config import GuildConfigCache
+from utils.extension_loader import load_extensions
+from utils.startup_report import StartupReport
 
 # Set up logging
 logging.basicConfig(
@@ -25,6 +30,8 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 if not TOKEN:
     raise ValueError("No Discord token found in .env file")
+# Sync commands to this guild only, for development
+DEV_GUILD_ID = os.getenv('DEV_GUILD_ID')
 
 class Bot(commands.Bot):
     def __init__(self):
@@ -39,61 +46,115 @@ class Bot(commands.Bot):
             help_command=None
         )
         self.db = None
+        self.config = None
+        # State handed from an unloading cog to its replacement during reload_cog
+        self.cog_state = {}
+        self._reloading = set()
+        self._tasks_started = False
+        self.startup_report = None
         logger.info("Bot initialized")
 
     async def setup_hook(self):
         logger.info("Setting up bot...")
+        setup_start = time.perf_counter()
         
         # Database setup
+        phase_start = time.perf_counter()
         try:
             ssl_context = ssl.create_default_context(
                 cafile="certs/root.crt"
             )
-            self.db = await asyncpg.create_pool(
-                os.getenv('DATABASE_URL'),
-                ssl=ssl_context,
-                min_size=5,
-                max_size=20
-            )
+            self.db = DatabaseManager(ssl=ssl_context)
+            await self.db.connect()
+            self.config = GuildConfigCache(self.db)
             logger.info("Database connected successfully")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             logger.error(traceback.format_exc())
             raise
-
-        # Clear existing commands
-        logger.info("Clearing existing commands...")
-        self.tree.clear_commands(guild=None)
-        await self.tree.sync()
+        logger.info(f"Startup phase 'database' took {time.perf_counter() - phase_start:.2f}s")
 
         # Load cogs
+        phase_start = time.perf_counter()
+        report = self.startup_report = StartupReport()
         try:
             cogs_dir = Path(__file__).parent.parent / 'cogs'
-            for filename in os.listdir(cogs_dir):
-                if filename.endswith('.py') and not filename.startswith('__'):
-                    try:
-                        await self.load_extension(f'cogs.{filename[:-3]}')
-                        logger.info(f"Loaded cog: {filename}")
-                    except Exception as e:
-                        logger.error(f"Failed to load {filename}: {e}")
-                        logger.error(traceback.format_exc())
+            extensions = [
+                f'cogs.{filename[:-3]}' for filename in os.listdir(cogs_dir)
+                if filename.endswith('.py') and not filename.startswith('__')
+            ]
+            await load_extensions(self, extensions, report)
         except Exception as e:
             logger.error(f"Error loading cogs: {e}")
             logger.error(traceback.format_exc())
+        self.startup_report = None
+        report.log()
+        logger.info(f"Startup phase 'cogs' took {time.perf_counter() - phase_start:.2f}s")
 
-        # Sync commands
+        # Sync commands only when their definitions changed since the last sync
+        phase_start = time.perf_counter()
         try:
-            commands = await self.tree.sync()
-            logger.info(f"Synced {len(commands)} commands")
-            for cmd in commands:
-                logger.info(f"Registered: /{cmd.name}")
+            force = os.getenv('FORCE_COMMAND_SYNC') == '1'
+            if DEV_GUILD_ID:
+                # Guild commands update instantly, so development syncs there instead of globally
+                dev_guild = discord.Object(id=int(DEV_GUILD_ID))
+                self.tree.copy_global_to(guild=dev_guild)
+                await sync_if_changed(self.tree, self.application_id, guild=dev_guild, force=force)
+            else:
+                await sync_if_changed(self.tree, self.application_id, force=force)
         except Exception as e:
             logger.error(f"Command sync failed: {e}")
             logger.error(traceback.format_exc())
+        logger.info(f"Startup phase 'command sync' took {time.perf_counter() - phase_start:.2f}s")
+        logger.info(f"Setup finished in {time.perf_counter() - setup_start:.2f}s")
+
+    async def close(self):
+        # Extensions are unloaded first so cogs can flush their buffers to the database
+        await super().close()
+        if self.db:
+            await self.db.close()
+
+    async def add_cog(self, cog, **kwargs):
+        if self.startup_report:
+            self.startup_report.cog_added(cog)
+        await super().add_cog(cog, **kwargs)
+        # Cogs added after startup (reloads) don't get another on_ready
+        if self._tasks_started:
+            await self.start_cog_tasks(cog)
+
+    async def start_cog_tasks(self, cog):
+        """Start a cog's background work once the gateway cache is populated"""
+        start_tasks = getattr(cog, 'start_tasks', None)
+        if start_tasks is None:
+            return
+        try:
+            await start_tasks()
+        except Exception as e:
+            logger.error(f"Failed to start background tasks for {cog.qualified_name}: {e}")
+            logger.error(traceback.format_exc())
+
+    def is_reloading(self, extension: str) -> bool:
+        return extension in self._reloading
+
+    async def reload_cog(self, extension: str):
+        """Reload an extension in place; cogs use cog_state to carry state across"""
+        self._reloading.add(extension)
+        try:
+            await self.reload_extension(extension)
+        finally:
+            # Cogs only read their state, so if the new module fails to load, the old
+            # one that discord.py restores adopts the same resources; drop it only now
+            self._reloading.discard(extension)
+            self.cog_state.pop(extension, None)
 
     async def on_ready(self):
         logger.info(f"Bot is ready: {self.user.name} ({self.user.id})")
         logger.info(f"Connected to {len(self.guilds)} guilds")
+        # on_ready fires again after reconnects; tasks are only started the first time
+        if not self._tasks_started:
+            self._tasks_started = True
+            for cog in list(self.cogs.values()):
+                await self.start_cog_tasks(cog)
 
     async def on_command_error(self, ctx, error):
         logger.error(f"Command error: {error}")
@@ -1,66 +1,326 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from collections import Counter, defaultdict
-import matplotlib.pyplot as plt
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import io
-from textblob import TextBlob
-import pandas as pd
-import seaborn as sns
+from utils.batch_writer import BatchWriter
+from utils.chart_renderer import ChartRenderer
+from utils.process_pool import worker_pool
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
+# Slash command timeframe choices mapped to Postgres intervals
+TIMEFRAMES = {
+    'day': '1 day',
+    'week': '7 days',
+    'month': '30 days',
+    'year': '365 days'
+}
+
+# Members walked per step of the join-date backfill before yielding to the event loop
+BACKFILL_CHUNK = 1000
+
 class Analytics(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        # Message events are written behind in bulk instead of one INSERT per message
+        self.ingest = BatchWriter(
+            'analytics',
+            self.db.log_message_events,
+            max_batch=500,
+            flush_interval=5.0
+        )
+        self.member_events = BatchWriter(
+            'member_events',
+            self.db.log_member_events,
+            max_batch=500,
+            flush_interval=5.0
+        )
+        self.backfill_task = None
+        state = bot.cog_state.get(__name__)
+        if state:
+            self.chart_pool = state['chart_pool']
+            self.charts = state['charts']
+            self.recording_since = state['recording_since']
+        else:
+            # Figures are drawn in worker processes so a render never stalls the gateway
+            self.chart_pool = worker_pool(max_workers=2)
+            self.charts = ChartRenderer(self.chart_pool)
+            # Joins after this are recorded live, so the backfill must stop here
+            self.recording_since = datetime.now(dt_timezone.utc)
+
+    async def cog_load(self):
+        self.ingest.start()
+        self.member_events.start()
+
+    async def start_tasks(self):
+        self.backfill_task = asyncio.create_task(
+            self.backfill_member_growth(self.bot.guilds, self.recording_since)
+        )
+
+    async def cog_unload(self):
+        if self.backfill_task:
+            self.backfill_task.cancel()
+        await self.ingest.close()
+        await self.member_events.close()
+        if self.bot.is_reloading(__name__):
+            self.bot.cog_state[__name__] = {
+                'chart_pool': self.chart_pool,
+                'charts': self.charts,
+                'recording_since': self.recording_since
+            }
+            return
+        self.chart_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def backfill_member_growth(self, guilds, cutoff: datetime):
+        """Seed member_growth_daily from current members' join dates before `cutoff`, once per guild"""
+        pending = await self.db.get_unbackfilled_guilds([guild.id for guild in guilds])
+        for guild_id, recorded_since in pending.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            # Joins recorded live by an earlier run (whose backfill failed) are already counted
+            guild_cutoff = min(cutoff, recorded_since) if recorded_since else cutoff
+            try:
+                if not guild.chunked:
+                    await guild.chunk()
+                joins = Counter()
+                members = list(guild.members)
+                for start in range(0, len(members), BACKFILL_CHUNK):
+                    for member in members[start:start + BACKFILL_CHUNK]:
+                        if member.joined_at and member.joined_at < guild_cutoff:
+                            joins[member.joined_at.date()] += 1
+                    await asyncio.sleep(0)
+
+                # Only members who are still here are known, so counts are a lower bound
+                rows = []
+                member_count = 0
+                for day in sorted(joins):
+                    member_count += joins[day]
+                    rows.append((day, joins[day], member_count))
+                await self.db.backfill_member_growth(guild_id, rows)
+                logger.info(f"Backfilled member growth for guild {guild_id}: {len(rows)} days")
+            except Exception as e:
+                logger.error(f"Member growth backfill failed for guild {guild_id}: {e}")
+
+    def record_member_event(self, member, event_type: str):
+        self.member_events.add((
+            member.guild.id,
+            member.id,
+            event_type,
+            member.joined_at,
+            datetime.now(dt_timezone.utc),
+            member.guild.member_count
+        ))
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.record_member_event(member, 'join')
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.record_member_event(member, 'leave')
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        await self.backfill_member_growth([guild], datetime.now(dt_timezone.utc))
+
+    def ingest_stats(self) -> dict:
+        """Queue depth and flush latency of the analytics ingestion buffer"""
+        return self.ingest.stats()
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        if message.author.bot:
+        if message.author.bot or not message.guild:
             return
 
-        # Log message activity
-        await self.db.log_analytics(
+        # Queue message activity
+        self.ingest.add((
             message.guild.id,
-            'message',
             message.channel.id,
-            1,
-            {
-                'user_id': message.author.id,
-                'hour': message.created_at.hour
-            }
-        )
+            message.author.id,
+            message.created_at
+        ))
 
     @app_commands.command(name="serverstats")
     async def server_stats(self, interaction: discord.Interaction, timeframe: str = "week"):
+        interval = TIMEFRAMES.get(timeframe)
+        if not interval:
+            await interaction.response.send_message(
+                f"Timeframe must be one of: {', '.join(TIMEFRAMES)}",
+                ephemeral=True
+            )
+            return
+
         await interaction.response.defer()
 
-        # Get analytics data
-        message_data = await self.db.get_analytics_data(
-            interaction.guild_id,
-            'message',
-            timeframe
+        # Rollups keep this proportional to the number of hourly buckets, not messages
+        totals = await self.db.get_analytics(interaction.guild_id, interval)
+        hourly = await self.db.get_hourly_activity(interaction.guild_id, interval)
+        top_channels = await self.db.get_top_channels(interaction.guild_id, interval)
+
+        by_hour = Counter()
+        for row in hourly:
+            by_hour[row['bucket'].hour] += row['message_count']
+
+        embed = discord.Embed(
+            title=f"Server Stats - past {timeframe}",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
         )
+        embed.add_field(name="Messages", value=totals['message_count'])
+        embed.add_field(name="Active Users", value=totals['unique_users'])
+        embed.add_field(name="Active Channels", value=totals['active_channels'])
 
-        # Process data for visualization
-        df = pd.DataFrame(message_data)
-        
-        # Create visualizations...
-        # (rest of your visualization code)
+        if by_hour:
+            peak_hour, peak_count = by_hour.most_common(1)[0]
+            embed.add_field(
+                name="Busiest Hour (UTC)",
+                value=f"{peak_hour:02d}:00 ({peak_count} messages)"
+            )
+
+        if top_channels:
+            embed.add_field(
+                name="Top Channels",
+                value="\n".join(
+                    f"<#{row['channel_id']}>: {row['message_count']}" for row in top_channels
+                ),
+                inline=False
+            )
+
+        if not by_hour:
+            await interaction.followup.send(embed=embed)
+            return
+
+        async def chart_data():
+            return {
+                'counts': [by_hour[hour] for hour in range(24)],
+                'title': f"Messages per hour - past {timeframe}"
+            }
+
+        png, _ = await self.charts.render(interaction.guild_id, 'hourly', timeframe, chart_data)
+        embed.set_image(url="attachment://hourly.png")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="hourly.png"))
 
     @app_commands.command(name="activity")
-    async def activity_heatmap(self, interaction: discord.Interaction):
+    async def activity_heatmap(
+        self,
+        interaction: discord.Interaction,
+        timeframe: str = "month",
+        timezone: str = "UTC",
+        channel: Optional[discord.TextChannel] = None
+    ):
         """Generate server activity heatmap"""
-        # Implementation here
+        interval = TIMEFRAMES.get(timeframe)
+        if not interval:
+            await interaction.response.send_message(
+                f"Timeframe must be one of: {', '.join(TIMEFRAMES)}",
+                ephemeral=True
+            )
+            return
+        try:
+            ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            await interaction.response.send_message(
+                "Unknown timezone; use an IANA name like `Europe/Berlin`.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer()
+        # numpy is only needed here, so it is imported on first use like the chart libraries
+        from utils.heatmap import activity_matrix, peak_cells
+
+        channel_id = channel.id if channel else None
+        scope = f"{channel.mention}" if channel else "the server"
+
+        async def chart_data():
+            epochs, counts = await self.db.get_activity_arrays(interaction.guild_id, interval, channel_id)
+            matrix = activity_matrix(epochs, counts, timezone)
+            return {
+                'matrix': matrix.tolist(),
+                'peaks': peak_cells(matrix),
+                'timezone': timezone,
+                'title': f"Activity - past {timeframe}"
+            }
+
+        png, data = await self.charts.render(
+            interaction.guild_id, 'heatmap', f"{timeframe}:{timezone}:{channel_id}", chart_data
+        )
+
+        embed = discord.Embed(
+            title="Activity Heatmap",
+            description=f"Messages in {scope} by weekday and hour ({timezone}), past {timeframe}",
+            color=discord.Color.blue()
+        )
+        if data['peaks']:
+            embed.add_field(
+                name="Busiest Times",
+                value="\n".join(f"{day} {hour:02d}:00 - {count} messages" for day, hour, count in data['peaks']),
+                inline=False
+            )
+        embed.set_image(url="attachment://activity.png")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="activity.png"))
 
     @app_commands.command(name="growth")
-    async def server_growth(self, interaction: discord.Interaction):
+    async def server_growth(self, interaction: discord.Interaction, timeframe: str = "month"):
         """Show server growth statistics"""
-        # Implementation here
+        interval = TIMEFRAMES.get(timeframe)
+        if not interval:
+            await interaction.response.send_message(
+                f"Timeframe must be one of: {', '.join(TIMEFRAMES)}",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer()
+
+        rows = await self.db.get_member_growth(interaction.guild_id, interval)
+        joins = sum(row['joins'] for row in rows)
+        leaves = sum(row['leaves'] for row in rows)
+        counts = [row['member_count'] for row in rows if row['member_count'] is not None]
+        embed = discord.Embed(
+            title=f"Server Growth - past {timeframe}",
+            color=discord.Color.green() if joins >= leaves else discord.Color.red(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="Joins", value=joins)
+        embed.add_field(name="Leaves", value=leaves)
+        embed.add_field(name="Net Growth", value=f"{joins - leaves:+d}")
+        if counts:
+            embed.add_field(name="Members", value=f"{counts[0]} → {counts[-1]}")
+        if joins:
+            # Of the members who joined in this period, how many are still here
+            departed = sum(row['cohort_departed'] for row in rows)
+            embed.add_field(name="Retention", value=f"{max(0.0, 1 - departed / joins):.1%}")
+
+        if not rows:
+            embed.description = "No join or leave activity recorded yet."
+            await interaction.followup.send(embed=embed)
+            return
+
+        async def chart_data():
+            return {
+                'days': [row['day'].isoformat() for row in rows],
+                'joins': [row['joins'] for row in rows],
+                'leaves': [row['leaves'] for row in rows],
+                'member_count': [row['member_count'] for row in rows],
+                'cohort_departed': [row['cohort_departed'] for row in rows],
+                'title': f"Member growth - past {timeframe}"
+            }
+
+        png, _ = await self.charts.render(interaction.guild_id, 'growth', timeframe, chart_data)
+        embed.set_image(url="attachment://growth.png")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="growth.png"))
 
 async def setup(bot):
     await bot.add_cog(Analytics(bot)) 
\ No newline at end of file
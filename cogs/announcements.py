@@ -3,24 +3,33 @@ from discord import app_commands
 from discord.ext import commands
 import json
 import logging
-from datetime import datetime
-import asyncio
+from datetime import datetime, timezone
+from utils.scheduler import DeadlineScheduler, REPEAT_TYPES, next_occurrence
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
 class Announcements(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.db = bot.db
+        # id -> scheduled_announcements row; the scheduler only holds ids and due times
         self.scheduled_announcements = {}
         self.announcement_templates = {}
+        self.legacy_scheduled = {}
+        self.scheduler = DeadlineScheduler(
+            self.send_scheduled_announcement,
+            name='announcements',
+            max_concurrency=5
+        )
         self.load_data()
-        self.bg_task = self.bot.loop.create_task(self.check_scheduled_announcements())
 
     def load_data(self):
         try:
             with open('data/announcements.json', 'r') as f:
                 data = json.load(f)
-                self.scheduled_announcements = data.get('scheduled', {})
+                self.legacy_scheduled = data.get('scheduled', {})
                 self.announcement_templates = data.get('templates', {})
         except FileNotFoundError:
             self.save_data()
@@ -28,10 +37,40 @@ class Announcements(commands.Cog):
     def save_data(self):
         with open('data/announcements.json', 'w') as f:
             json.dump({
-                'scheduled': self.scheduled_announcements,
                 'templates': self.announcement_templates
             }, f, indent=4)
 
+    async def cog_load(self):
+        await self.migrate_legacy_schedules()
+        for row in await self.db.get_scheduled_announcements():
+            self.scheduled_announcements[row['id']] = dict(row)
+            self.scheduler.schedule(row['id'], row['schedule_time'])
+        logger.info(f"Loaded {len(self.scheduled_announcements)} scheduled announcements")
+
+    async def start_tasks(self):
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        await self.scheduler.stop()
+
+    async def migrate_legacy_schedules(self):
+        """Move schedules from data/announcements.json into the database once"""
+        if not self.legacy_scheduled:
+            return
+        for data in self.legacy_scheduled.values():
+            schedule_time = datetime.strptime(data['time'], "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
+            await self.db.schedule_announcement(
+                data['guild_id'],
+                data['channel_id'],
+                data['title'],
+                data['content'],
+                schedule_time,
+                data['repeat']
+            )
+        logger.info(f"Migrated {len(self.legacy_scheduled)} scheduled announcements to the database")
+        self.legacy_scheduled = {}
+        self.save_data()
+
     @app_commands.command(name="announce", description="Create an announcement")
     @app_commands.default_permissions(manage_messages=True)
     async def announce(
@@ -76,7 +115,7 @@ class Announcements(commands.Cog):
         repeat: str = None  # daily, weekly, monthly, or None
     ):
         try:
-            schedule_time = datetime.strptime(time, "%Y-%m-%d %H:%M")
+            schedule_time = datetime.strptime(time, "%Y-%m-%d %H:%M").replace(tzinfo=timezone.utc)
         except ValueError:
             await interaction.response.send_message(
                 "Invalid time format! Use YYYY-MM-DD HH:MM",
@@ -84,20 +123,35 @@ class Announcements(commands.Cog):
             )
             return
 
-        announcement_id = str(len(self.scheduled_announcements) + 1)
+        if repeat is not None and repeat not in REPEAT_TYPES:
+            await interaction.response.send_message(
+                f"Repeat must be one of: {', '.join(REPEAT_TYPES)}",
+                ephemeral=True
+            )
+            return
+
+        announcement_id = await self.db.schedule_announcement(
+            interaction.guild_id,
+            channel.id,
+            title,
+            content,
+            schedule_time,
+            repeat
+        )
         self.scheduled_announcements[announcement_id] = {
+            'id': announcement_id,
+            'guild_id': interaction.guild_id,
             'channel_id': channel.id,
             'title': title,
             'content': content,
-            'time': time,
-            'repeat': repeat,
-            'guild_id': interaction.guild_id
+            'schedule_time': schedule_time,
+            'start_time': schedule_time,
+            'repeat_type': repeat
         }
-        
-        self.save_data()
+        self.scheduler.schedule(announcement_id, schedule_time)
         
         await interaction.response.send_message(
-            f"Announcement scheduled for {time}",
+            f"Announcement scheduled for {time} UTC",
             ephemeral=True
         )
 
@@ -157,44 +211,43 @@ class Announcements(commands.Cog):
             ephemeral=True
         )
 
-    async def check_scheduled_announcements(self):
+    async def send_scheduled_announcement(self, announcement_id: int):
+        """Scheduler callback: post the announcement and queue its next repeat"""
+        data = self.scheduled_announcements.get(announcement_id)
+        if not data:
+            return
+
         await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            current_time = datetime.utcnow()
-            to_remove = []
-            
-            for announcement_id, data in self.scheduled_announcements.items():
-                schedule_time = datetime.strptime(data['time'], "%Y-%m-%d %H:%M")
-                
-                if current_time >= schedule_time:
-                    channel = self.bot.get_channel(data['channel_id'])
-                    if channel:
-                        embed = discord.Embed(
-                            title=data['title'],
-                            description=data['content'],
-                            color=discord.Color.blue(),
-                            timestamp=current_time
-                        )
-                        await channel.send(embed=embed)
-                    
-                    if data['repeat']:
-                        # Update next schedule time based on repeat type
-                        if data['repeat'] == 'daily':
-                            next_time = schedule_time + timedelta(days=1)
-                        elif data['repeat'] == 'weekly':
-                            next_time = schedule_time + timedelta(weeks=1)
-                        elif data['repeat'] == 'monthly':
-                            next_time = schedule_time + timedelta(days=30)
-                            
-                        data['time'] = next_time.strftime("%Y-%m-%d %H:%M")
-                    else:
-                        to_remove.append(announcement_id)
-            
-            for announcement_id in to_remove:
-                del self.scheduled_announcements[announcement_id]
-                
-            self.save_data()
-            await asyncio.sleep(60)  # Check every minute
+        now = datetime.now(timezone.utc)
+        channel = self.bot.get_channel(data['channel_id'])
+        if channel:
+            embed = discord.Embed(
+                title=data['title'],
+                description=data['content'],
+                color=discord.Color.blue(),
+                timestamp=now
+            )
+            try:
+                await channel.send(embed=embed)
+            except discord.HTTPException as e:
+                # Still reschedule or retire it below, or a repeat would stop for good
+                logger.error(f"Failed to send announcement {announcement_id} in {data['channel_id']}: {e}")
+        else:
+            logger.warning(f"Channel {data['channel_id']} for announcement {announcement_id} not found")
+
+        if data['repeat_type'] in REPEAT_TYPES:
+            # Missed occurrences (e.g. while offline) are caught up with this single send
+            next_time, skipped = next_occurrence(
+                data['start_time'], data['schedule_time'], data['repeat_type'], now
+            )
+            if skipped:
+                logger.info(f"Announcement {announcement_id} caught up after missing {skipped} occurrences")
+            data['schedule_time'] = next_time
+            await self.db.update_announcement_time(announcement_id, next_time)
+            self.scheduler.schedule(announcement_id, next_time)
+        else:
+            del self.scheduled_announcements[announcement_id]
+            await self.db.delete_scheduled_announcement(announcement_id)
 
 async def setup(bot):
     await bot.add_cog(Announcements(bot)) 
\ No newline at end of file
@@ -1,19 +1,191 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from typing import Optional, List
 import logging
-from utils.word_filter import EnhancedWordFilter
+from datetime import timedelta
+from utils.word_filter import EnhancedWordFilter, FilterMatch, MATCH_MODES
+from utils.regex_safety import MAX_PATTERN_LENGTH, analyze_pattern
 import io
 import csv
+import time
+import aiohttp
+from utils.csv_stream import iter_csv_rows
+from utils.process_pool import worker_pool
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db', 'config')
+
+# Values accepted in filter_settings.filter_action
+FILTER_ACTIONS = ('log', 'delete', 'warn', 'timeout', 'kick')
+FILTER_TIMEOUT = timedelta(minutes=10)
+
+# /importpatterns limits
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ROWS = 100000
+MIN_SEVERITY = 1
+MAX_SEVERITY = 10
+IMPORT_PROGRESS_INTERVAL = 2.0
+
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        self.word_filter = EnhancedWordFilter(self.db)
+        self.config = bot.config
+        state = bot.cog_state.get(__name__)
+        if state:
+            # Reloaded: keep the compiled pattern sets and warm worker processes
+            self.filter_pool = state['filter_pool']
+            self.word_filter = state['word_filter']
+        else:
+            # Guilds with very large pattern sets are matched off the event loop
+            self.filter_pool = worker_pool(max_workers=2)
+            self.word_filter = EnhancedWordFilter(self.db, executor=self.filter_pool)
+
+    async def start_tasks(self):
+        self.pattern_invalidation.start()
+
+    async def cog_unload(self):
+        self.pattern_invalidation.cancel()
+        if self.bot.is_reloading(__name__):
+            self.bot.cog_state[__name__] = {
+                'filter_pool': self.filter_pool,
+                'word_filter': self.word_filter
+            }
+            return
+        self.filter_pool.shutdown(wait=False, cancel_futures=True)
+
+    @tasks.loop(seconds=5)
+    async def pattern_invalidation(self):
+        """Pick up pattern changes made by other bot processes"""
+        try:
+            await self.word_filter.poll_invalidations()
+        except Exception as e:
+            logger.error(f"Error polling filter pattern versions: {e}")
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or not message.guild or not message.content:
+            return
+        # Webhooks and members who have since left arrive as plain Users
+        if isinstance(message.author, discord.Member) and message.author.guild_permissions.manage_messages:
+            return
+
+        try:
+            matches = await self.word_filter.check_message(message.guild.id, message.content)
+            if matches:
+                await self.apply_filter_action(message, matches)
+        except Exception as e:
+            logger.error(f"Error filtering message in guild {message.guild.id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.word_filter.forget_guild(guild.id)
+
+    async def apply_filter_action(self, message: discord.Message, matches: List[FilterMatch]):
+        """Enforce the guild's filter_action for the most severe match"""
+        worst = max(matches, key=lambda m: m.severity)
+        settings = await self.config.filter_settings(message.guild.id)
+        action = settings.filter_action
+        if action not in FILTER_ACTIONS:
+            action = 'warn'
+        reason = f"Filtered content ({worst.category})"
+
+        try:
+            if action != 'log':
+                await message.delete()
+            if action == 'warn':
+                await self.db.add_warning(
+                    message.guild.id,
+                    message.author.id,
+                    self.bot.user.id,
+                    reason
+                )
+            elif not isinstance(message.author, discord.Member):
+                # Webhooks and departed members can't be timed out or kicked; deleting is all we can do
+                pass
+            elif action == 'timeout':
+                await message.author.timeout(FILTER_TIMEOUT, reason=reason)
+            elif action == 'kick':
+                await message.author.kick(reason=reason)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not apply filter action '{action}' in guild {message.guild.id}: {e}")
+
+        await self.db.log_filter_violation(
+            message.guild.id,
+            message.author.id,
+            message.channel.id,
+            worst.severity,
+            message_content=message.content,
+            matched_pattern=worst.pattern,
+            category=worst.category,
+            action_taken=action
+        )
+
+        channel = message.guild.get_channel(settings.notify_channel) if settings.notify_channel else None
+        if channel:
+            embed = discord.Embed(
+                title="Filter Violation",
+                description=f"{message.author.mention} in {message.channel.mention}",
+                color=discord.Color.red()
+            )
+            embed.add_field(name="Category", value=worst.category)
+            embed.add_field(name="Severity", value=worst.severity)
+            embed.add_field(name="Action", value=action)
+            embed.add_field(name="Matched", value=worst.matched_text[:1024] or "-", inline=False)
+            await channel.send(embed=embed)
+
+    @app_commands.command(name="filtersettings")
+    @app_commands.default_permissions(manage_guild=True)
+    async def filter_settings(
+        self,
+        interaction: discord.Interaction,
+        action: str,
+        notify_channel: Optional[discord.TextChannel] = None
+    ):
+        """Set what happens when a message matches the filter"""
+        if action not in FILTER_ACTIONS:
+            await interaction.response.send_message(
+                f"Action must be one of: {', '.join(FILTER_ACTIONS)}",
+                ephemeral=True
+            )
+            return
+
+        await self.config.update_filter_settings(interaction.guild_id, {
+            'filter_action': action,
+            'notify_channel': notify_channel.id if notify_channel else None
+        })
+        await interaction.response.send_message(
+            f"Filter action set to **{action}**"
+            + (f", notifying {notify_channel.mention}" if notify_channel else ""),
+            ephemeral=True
+        )
+
+    @app_commands.command(name="filterstats")
+    @app_commands.default_permissions(manage_guild=True)
+    async def filter_stats(self, interaction: discord.Interaction):
+        """Show filter latency for this server"""
+        latency = self.word_filter.latency.summary(interaction.guild_id)
+        entry = self.word_filter.pattern_cache.get(interaction.guild_id)
+        pattern_count = entry.value.pattern_count if entry else 0
+
+        embed = discord.Embed(
+            title="Filter Stats",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Patterns", value=pattern_count)
+        embed.add_field(
+            name="Matching",
+            value="worker process" if pattern_count >= self.word_filter.offload_threshold else "inline"
+        )
+        embed.add_field(name="Messages Checked", value=latency['count'])
+        if latency['count']:
+            embed.add_field(name="p50", value=f"{latency['p50_ms']}ms")
+            embed.add_field(name="p99", value=f"{latency['p99_ms']}ms")
+            embed.add_field(name="Max", value=f"{latency['max_ms']}ms")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @app_commands.command(name="addpattern")
     @app_commands.default_permissions(manage_guild=True)
@@ -24,9 +196,40 @@ class AutoMod(commands.Cog):
         category: str,
         severity: int = 1,
         is_regex: bool = False,
-        description: str = None
+        description: str = None,
+        match_mode: str = "word"
     ):
         """Add a new filter pattern"""
+        if match_mode not in MATCH_MODES:
+            await interaction.response.send_message(
+                f"Match mode must be one of: {', '.join(MATCH_MODES)}",
+                ephemeral=True
+            )
+            return
+
+        if not MIN_SEVERITY <= severity <= MAX_SEVERITY:
+            await interaction.response.send_message(
+                f"Severity must be between {MIN_SEVERITY} and {MAX_SEVERITY}.",
+                ephemeral=True
+            )
+            return
+
+        if len(pattern) > MAX_PATTERN_LENGTH:
+            await interaction.response.send_message(
+                f"Patterns can be at most {MAX_PATTERN_LENGTH} characters.",
+                ephemeral=True
+            )
+            return
+
+        if is_regex:
+            analysis = analyze_pattern(pattern)
+            if not analysis.safe:
+                await interaction.response.send_message(
+                    f"Pattern rejected: {analysis.reason}",
+                    ephemeral=True
+                )
+                return
+
         try:
             await self.db.add_filter_pattern(
                 guild_id=interaction.guild_id,
@@ -36,11 +239,12 @@ class AutoMod(commands.Cog):
                 category=category,
                 description=description,
                 is_regex=is_regex,
-                created_by=interaction.user.id
+                created_by=interaction.user.id,
+                match_mode=match_mode
             )
             
             # Refresh patterns
-            await self.word_filter.load_patterns(interaction.guild_id)
+            await self.word_filter.patterns_changed(interaction.guild_id)
             
             await interaction.response.send_message(
                 f"Added new pattern to category '{category}'",
@@ -68,38 +272,109 @@ class AutoMod(commands.Cog):
             )
             return
 
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        stats = {'rows': 0, 'rejected': 0}
+        last_report = time.monotonic()
+
+        async def report_progress(content: str):
+            nonlocal last_report
+            if time.monotonic() - last_report < IMPORT_PROGRESS_INTERVAL:
+                return
+            last_report = time.monotonic()
+            try:
+                await interaction.edit_original_response(content=content)
+            except discord.HTTPException as e:
+                # Progress is cosmetic; a rate limit or expired token must not abort the import
+                logger.debug(f"Could not update import progress: {e}")
+
         try:
-            content = await file.read()
-            csv_content = content.decode('utf-8').splitlines()
-            reader = csv.DictReader(csv_content)
-            
-            patterns_added = 0
-            for row in reader:
-                await self.db.add_filter_pattern(
-                    guild_id=interaction.guild_id,
-                    pattern=row['pattern'],
-                    regex_pattern=row.get('regex_pattern'),
-                    severity=int(row.get('severity', 1)),
-                    category=row.get('category', 'default'),
-                    description=row.get('description'),
-                    is_regex=row.get('is_regex', '').lower() == 'true',
-                    created_by=interaction.user.id
-                )
-                patterns_added += 1
+            # Download and validate the whole file before the transaction opens,
+            # so a slow or hostile upload never holds it open
+            batches = []
+            async with aiohttp.ClientSession() as session:
+                async with session.get(file.url) as resp:
+                    resp.raise_for_status()
+                    rows = iter_csv_rows(resp.content.iter_chunked(64 * 1024))
+                    async for batch in self._pattern_batches(rows, interaction.user.id, stats):
+                        batches.append(batch)
+                        await report_progress(f"Reading... {stats['rows']} rows checked so far.")
 
-            await self.word_filter.load_patterns(interaction.guild_id)
-            
-            await interaction.response.send_message(
-                f"Successfully imported {patterns_added} patterns.",
-                ephemeral=True
+            added, duplicates = await self.db.import_filter_patterns(
+                interaction.guild_id,
+                batches,
+                progress=lambda added: report_progress(f"Importing... {added} patterns written so far.")
+            )
+
+            # Rebuild the matcher once for the whole import
+            await self.word_filter.patterns_changed(interaction.guild_id)
+
+            message = f"Successfully imported {added} patterns."
+            if duplicates:
+                message += f" Skipped {duplicates} duplicates."
+            if stats['rejected']:
+                message += f" Rejected {stats['rejected']} invalid or unsafe rows."
+            if stats['rows'] >= MAX_IMPORT_ROWS:
+                message += f" Stopped after {MAX_IMPORT_ROWS} rows."
+            await interaction.edit_original_response(content=message)
+        except csv.Error as e:
+            logger.warning(f"Rejected malformed pattern CSV in guild {interaction.guild_id}: {e}")
+            await interaction.edit_original_response(
+                content=f"Could not read the CSV file: {e}. Nothing was imported."
             )
         except Exception as e:
             logger.error(f"Error importing patterns: {e}")
-            await interaction.response.send_message(
-                "Failed to import patterns.",
-                ephemeral=True
+            await interaction.edit_original_response(
+                content="Failed to import patterns. Nothing was imported."
             )
 
+    async def _pattern_batches(self, rows, created_by: int, stats: dict):
+        """Validate CSV rows as they stream in and group them into insert batches"""
+        batch = []
+        async for row in rows:
+            if stats['rows'] >= MAX_IMPORT_ROWS:
+                break
+            stats['rows'] += 1
+            try:
+                batch.append(self._validate_pattern_row(row, created_by))
+            except (ValueError, KeyError):
+                stats['rejected'] += 1
+                continue
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _validate_pattern_row(self, row: dict, created_by: int) -> tuple:
+        pattern = (row.get('pattern') or '').strip()
+        regex_pattern = (row.get('regex_pattern') or '').strip() or None
+        is_regex = (row.get('is_regex') or '').strip().lower() == 'true'
+        match_mode = (row.get('match_mode') or '').strip() or 'word'
+        severity = int(row.get('severity') or 1)
+
+        if is_regex:
+            regex_pattern = regex_pattern or pattern
+            if not analyze_pattern(regex_pattern).safe:
+                raise ValueError("unsafe regex")
+            pattern = pattern or regex_pattern
+        if not pattern or len(pattern) > MAX_PATTERN_LENGTH:
+            raise ValueError("bad pattern")
+        if match_mode not in MATCH_MODES:
+            raise ValueError("bad match mode")
+        if not MIN_SEVERITY <= severity <= MAX_SEVERITY:
+            raise ValueError("bad severity")
+
+        return (
+            pattern,
+            regex_pattern if is_regex else None,
+            severity,
+            (row.get('category') or '').strip() or 'default',
+            row.get('description') or None,
+            is_regex,
+            created_by,
+            match_mode
+        )
+
     @app_commands.command(name="exportpatterns")
     @app_commands.default_permissions(manage_guild=True)
     async def export_patterns(self, interaction: discord.Interaction):
@@ -110,7 +385,7 @@ class AutoMod(commands.Cog):
             output = io.StringIO()
             writer = csv.DictWriter(output, fieldnames=[
                 'pattern', 'regex_pattern', 'severity', 'category',
-                'description', 'is_regex'
+                'description', 'is_regex', 'match_mode'
             ])
             
             writer.writeheader()
@@ -121,7 +396,8 @@ class AutoMod(commands.Cog):
                     'severity': pattern['severity'],
                     'category': pattern['category'],
                     'description': pattern['description'],
-                    'is_regex': pattern['is_regex']
+                    'is_regex': pattern['is_regex'],
+                    'match_mode': pattern.get('match_mode') or 'word'
                 })
             
             file = discord.File(
@@ -140,6 +416,44 @@ class AutoMod(commands.Cog):
                 ephemeral=True
             )
 
+    @app_commands.command(name="quarantinedpatterns")
+    @app_commands.default_permissions(manage_guild=True)
+    async def quarantined_patterns(self, interaction: discord.Interaction):
+        """List regex patterns disabled for being unsafe or too slow"""
+        quarantined = self.word_filter.quarantined.get(interaction.guild_id)
+        if not quarantined:
+            await interaction.response.send_message(
+                "No patterns are quarantined.",
+                ephemeral=True
+            )
+            return
+
+        embed = discord.Embed(
+            title="Quarantined Patterns",
+            color=discord.Color.orange()
+        )
+        for pattern, reason in list(quarantined.items())[:25]:
+            embed.add_field(name=f"`{pattern[:250]}`", value=reason, inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="releasepattern")
+    @app_commands.default_permissions(manage_guild=True)
+    async def release_pattern(self, interaction: discord.Interaction, pattern: Optional[str] = None):
+        """Re-enable a quarantined regex pattern, or all of them"""
+        released = self.word_filter.release_quarantined(interaction.guild_id, pattern)
+        if not released:
+            await interaction.response.send_message(
+                "No matching quarantined pattern.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.send_message(
+            f"Released {released} quarantined pattern(s). They are checked again from the next message.",
+            ephemeral=True
+        )
+
     @app_commands.command(name="violations")
     @app_commands.default_permissions(manage_guild=True)
     async def view_violations(
@@ -34,5 +34,22 @@ class Basic(commands.Cog):
         )
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="reload", description="Reload a cog without restarting the bot")
+    @app_commands.default_permissions(administrator=True)
+    async def reload(self, interaction: discord.Interaction, cog: str):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("Only the bot owner can reload cogs.", ephemeral=True)
+            return
+
+        extension = cog if cog.startswith('cogs.') else f'cogs.{cog}'
+        await interaction.response.defer(ephemeral=True)
+        try:
+            await self.bot.reload_cog(extension)
+        except commands.ExtensionError as e:
+            logger.error(f"Reload of {extension} failed: {e}")
+            await interaction.followup.send(f"Reload of `{extension}` failed: {e}")
+            return
+        await interaction.followup.send(f"Reloaded `{extension}`.")
+
 async def setup(bot):
     await bot.add_cog(Basic(bot)) 
\ No newline at end of file
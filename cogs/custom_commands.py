@@ -6,6 +6,8 @@ import logging
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
 class CustomCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
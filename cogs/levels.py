@@ -1,24 +1,148 @@
-from discord.ext import commands
+import discord
+from discord.ext import commands, tasks
+import asyncio
 from discord import app_commands
+import logging
+from datetime import datetime, timezone
+from utils.rank_index import RankIndexCache
+from utils.xp_engine import LEVEL_THRESHOLDS, MAX_LEVEL, XPEngine, advance_level, level_for_xp
+
+logger = logging.getLogger('discord')
+
+DEPENDENCIES = ('db',)
+
+# Seconds between batched XP writes
+XP_FLUSH_INTERVAL = 10
+LEADERBOARD_PAGE_SIZE = 10
 
 class Levels(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
-        self.xp_cooldowns = {}
+        self.xp = XPEngine()
+        self._writing = None
+        self.ranks = RankIndexCache(self.load_ranks)
+
+    async def cog_load(self):
+        self.flush_xp.start()
+        self.evict_ranks.start()
+
+    async def cog_unload(self):
+        self.flush_xp.cancel()
+        self.evict_ranks.cancel()
+        # Cancelling the loop only stops its wait; a batch already drained must land first
+        if self._writing and not self._writing.done():
+            await asyncio.wait([self._writing])
+        await self.write_xp()
+
+    async def load_ranks(self, guild_id: int):
+        user_ids, xp = await self.db.get_guild_xp(guild_id)
+        return zip(user_ids, xp)
+
+    @tasks.loop(minutes=5)
+    async def evict_ranks(self):
+        self.ranks.evict_idle()
+
+    @tasks.loop(seconds=XP_FLUSH_INTERVAL)
+    async def flush_xp(self):
+        self._writing = asyncio.create_task(self.write_xp())
+        await asyncio.shield(self._writing)
+
+    async def write_xp(self):
+        """Persist accumulated XP in one UPSERT and announce any level-ups"""
+        pending = self.xp.drain()
+        if not pending:
+            return
+
+        keys = list(pending)
+        try:
+            rows = await self.db.add_xp_batch(
+                [guild_id for guild_id, _ in keys],
+                [user_id for _, user_id in keys],
+                [pending[key].xp for key in keys],
+                [pending[key].messages for key in keys],
+                [datetime.fromtimestamp(pending[key].last_message_at, timezone.utc) for key in keys]
+            )
+        except Exception as e:
+            logger.error(f"XP flush of {len(keys)} users failed: {e}")
+            self.xp.restore(pending)
+            return
+
+        level_ups = []
+        for row in rows:
+            self.ranks.apply(row['guild_id'], row['user_id'], row['xp'])
+            level = advance_level(row['level'], row['xp'])
+            if level != row['level']:
+                level_ups.append((row['guild_id'], row['user_id'], level))
+
+        if not level_ups:
+            return
+        try:
+            await self.db.set_levels(level_ups)
+        except Exception as e:
+            # The next flush for these users recomputes the level from their XP
+            logger.error(f"Failed to store {len(level_ups)} level-ups: {e}")
+            return
+
+        for guild_id, user_id, level in level_ups:
+            channel_id = pending[(guild_id, user_id)].channel_id
+            channel = self.bot.get_channel(channel_id) if channel_id else None
+            if channel:
+                try:
+                    await channel.send(f"🎉 <@{user_id}> reached level **{level}**!")
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not announce level-up in {channel_id}: {e}")
 
     @app_commands.command(name="rank")
     async def rank(self, interaction: discord.Interaction, member: discord.Member = None):
         """Show user's rank and level"""
         member = member or interaction.user
-        # Implementation here
+        # The first lookup in a guild loads its whole standings, which can outlast the 3s reply window
+        await interaction.response.defer()
+        index = await self.ranks.get(interaction.guild_id)
+        xp = index.xp(member.id)
+        if xp is None:
+            await interaction.followup.send(f"{member.display_name} hasn't earned any XP yet.")
+            return
+
+        level = level_for_xp(xp)
+        embed = discord.Embed(title=f"{member.display_name}'s rank", color=discord.Color.blue())
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(name="Rank", value=f"#{index.rank(member.id):,} of {len(index):,}")
+        embed.add_field(name="Level", value=str(level))
+        if level < MAX_LEVEL:
+            current, needed = xp - LEVEL_THRESHOLDS[level], LEVEL_THRESHOLDS[level + 1] - LEVEL_THRESHOLDS[level]
+            embed.add_field(name="Progress", value=f"{current:,} / {needed:,} XP", inline=False)
+        embed.set_footer(text=f"Total XP: {xp:,}")
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="leaderboard")
-    async def leaderboard(self, interaction: discord.Interaction):
+    async def leaderboard(self, interaction: discord.Interaction, page: int = 1):
         """Show server leaderboard"""
-        # Implementation here
+        page = max(page, 1)
+        await interaction.response.defer()
+        index = await self.ranks.get(interaction.guild_id)
+        pages = max(1, -(-len(index) // LEADERBOARD_PAGE_SIZE))
+        entries = index.page(page, LEADERBOARD_PAGE_SIZE)
+        if not entries:
+            await interaction.followup.send(f"The leaderboard only has {pages} page(s).")
+            return
+
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        lines = [
+            f"**{start + i}.** <@{user_id}> — Level {level_for_xp(xp)} ({xp:,} XP)"
+            for i, (user_id, xp) in enumerate(entries, 1)
+        ]
+        embed = discord.Embed(title=f"{interaction.guild.name} Leaderboard", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text=f"Page {page}/{pages}")
+        await interaction.followup.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_message(self, message):
         """Handle XP gain from messages"""
-        # Implementation here 
\ No newline at end of file
+        if message.author.bot or not message.guild:
+            return
+        self.xp.award(message.guild.id, message.author.id, message.channel.id)
+
+async def setup(bot):
+    await bot.add_cog(Levels(bot))
@@ -4,7 +4,8 @@ from discord.ext import commands
 import json
 import logging
 from datetime import datetime
-import asyncio
+from utils.audit_log_cache import AuditLogCache
+from utils.log_dispatcher import LogDispatcher
 
 logger = logging.getLogger('discord')
 
@@ -13,7 +14,11 @@ class EventLogging(commands.Cog):
         self.bot = bot
         self.log_settings = {}
         self.load_settings()
-        self.audit_logs = {}
+        self.audit_logs = AuditLogCache()
+        self.dispatcher = LogDispatcher(bot)
+
+    async def cog_unload(self):
+        await self.dispatcher.close()
         
     def load_settings(self):
         try:
@@ -27,12 +32,13 @@ class EventLogging(commands.Cog):
             json.dump(self.log_settings, f, indent=4)
 
     async def log_event(self, guild_id: int, event_type: str, embed: discord.Embed):
-        guild_id = str(guild_id)
-        if guild_id in self.log_settings and event_type in self.log_settings[guild_id]:
-            channel_id = self.log_settings[guild_id][event_type]
-            channel = self.bot.get_channel(int(channel_id))
-            if channel:
-                await channel.send(embed=embed)
+        """Queue an embed for the guild's log channel; delivery happens in the background"""
+        settings = self.log_settings.get(str(guild_id))
+        if not settings:
+            return
+        channel_id = settings.get(event_type, settings.get("all"))
+        if channel_id:
+            self.dispatcher.enqueue(int(channel_id), embed)
 
     @app_commands.command(name="setlogchannel", description="Set a logging channel for specific events")
     @app_commands.default_permissions(manage_guild=True)
@@ -54,7 +60,15 @@ class EventLogging(commands.Cog):
             ephemeral=True
         )
 
+    def wants_event(self, guild_id: int, event_type: str) -> bool:
+        settings = self.log_settings.get(str(guild_id))
+        return bool(settings) and (event_type in settings or "all" in settings)
+
     # Event Listeners
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.audit_logs.discard(guild.id)
+
     @commands.Cog.listener()
     async def on_message_delete(self, message):
         if message.author.bot:
@@ -67,6 +81,20 @@ class EventLogging(commands.Cog):
             timestamp=datetime.utcnow()
         )
         embed.add_field(name="Content", value=message.content or "No content", inline=False)
+
+        if not self.wants_event(message.guild.id, "message_delete"):
+            return
+
+        # Discord only records deletions of someone else's message, merged per author and channel
+        entry = await self.audit_logs.resolve(
+            message.guild,
+            discord.AuditLogAction.message_delete,
+            message.author.id,
+            max_age=self.audit_logs.ttl,
+            channel_id=message.channel.id
+        )
+        if entry and entry.user_mention:
+            embed.add_field(name="Deleted by", value=entry.user_mention)
         
         await self.log_event(message.guild.id, "message_delete", embed)
 
@@ -104,23 +132,63 @@ class EventLogging(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
-        embed = discord.Embed(
-            title="Member Left",
-            description=f"{member.mention} left the server",
-            color=discord.Color.red(),
-            timestamp=datetime.utcnow()
-        )
+        if not self.wants_event(member.guild.id, "member_remove"):
+            return
+
+        # A kick looks like a leave on the gateway; only the audit log tells them apart
+        entry = await self.audit_logs.resolve(member.guild, discord.AuditLogAction.kick, member.id)
+        if entry:
+            embed = discord.Embed(
+                title="Member Kicked",
+                description=f"{member.mention} was kicked",
+                color=discord.Color.dark_red(),
+                timestamp=datetime.utcnow()
+            )
+            embed.add_field(name="Reason", value=entry.reason or "No reason provided", inline=False)
+            if entry.user_mention:
+                embed.add_field(name="Kicked by", value=entry.user_mention)
+        else:
+            embed = discord.Embed(
+                title="Member Left",
+                description=f"{member.mention} left the server",
+                color=discord.Color.red(),
+                timestamp=datetime.utcnow()
+            )
         embed.set_thumbnail(url=member.display_avatar.url)
         
         await self.log_event(member.guild.id, "member_remove", embed)
 
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles == after.roles or not self.wants_event(after.guild.id, "role_update"):
+            return
+
+        added = [role.mention for role in after.roles if role not in before.roles]
+        removed = [role.mention for role in before.roles if role not in after.roles]
+
+        embed = discord.Embed(
+            title="Roles Updated",
+            description=f"Roles changed for {after.mention}",
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        if added:
+            embed.add_field(name="Added", value=" ".join(added), inline=False)
+        if removed:
+            embed.add_field(name="Removed", value=" ".join(removed), inline=False)
+
+        entry = await self.audit_logs.resolve(after.guild, discord.AuditLogAction.member_role_update, after.id)
+        if entry and entry.user_mention:
+            embed.add_field(name="Changed by", value=entry.user_mention)
+
+        await self.log_event(after.guild.id, "role_update", embed)
+
     @commands.Cog.listener()
     async def on_member_ban(self, guild, user):
-        async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.ban):
-            if entry.target.id == user.id:
-                reason = entry.reason or "No reason provided"
-                moderator = entry.user
-                break
+        entry = await self.audit_logs.resolve(guild, discord.AuditLogAction.ban, user.id)
+        if entry:
+            reason = entry.reason or "No reason provided"
+            moderator = entry.user_mention
         else:
             reason = "No reason found"
             moderator = None
@@ -133,7 +201,7 @@ class EventLogging(commands.Cog):
         )
         embed.add_field(name="Reason", value=reason, inline=False)
         if moderator:
-            embed.add_field(name="Banned by", value=moderator.mention)
+            embed.add_field(name="Banned by", value=moderator)
             
         await self.log_event(guild.id, "member_ban", embed)
 
@@ -5,6 +5,8 @@ import logging
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -5,10 +5,21 @@ import logging
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
 class RoleManagement(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        # (message_id, emoji) -> role_id for every reaction role message
+        self.reaction_roles = {}
+
+    async def cog_load(self):
+        rows = await self.db.get_all_reaction_roles()
+        self.reaction_roles = {
+            (row['message_id'], row['emoji']): row['role_id'] for row in rows
+        }
+        logger.info(f"Loaded {len(self.reaction_roles)} reaction roles")
 
     @app_commands.command(name="createreactionrole")
     async def create_reaction_role(
@@ -31,24 +42,37 @@ class RoleManagement(commands.Cog):
             role.id,
             emoji
         )
+        self.reaction_roles[(message.id, emoji)] = role.id
 
         await interaction.response.send_message("Reaction role created!", ephemeral=True)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
-        if payload.member.bot:
+        # Reactions on unrelated messages stop at a single dict miss
+        role_id = self.reaction_roles.get((payload.message_id, str(payload.emoji)))
+        if role_id is None or not payload.member or payload.member.bot:
+            return
+
+        role = payload.member.guild.get_role(role_id)
+        if role:
+            await payload.member.add_roles(role)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        role_id = self.reaction_roles.get((payload.message_id, str(payload.emoji)))
+        if role_id is None:
+            return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        if not guild:
+            return
+        member = guild.get_member(payload.user_id)
+        if not member or member.bot:
             return
 
-        # Get reaction role from database
-        reaction_roles = await self.db.get_reaction_roles(payload.guild_id)
-        
-        for rr in reaction_roles:
-            if (rr['message_id'] == payload.message_id and 
-                rr['emoji'] == str(payload.emoji)):
-                role = payload.member.guild.get_role(rr['role_id'])
-                if role:
-                    await payload.member.add_roles(role)
-                break
+        role = guild.get_role(role_id)
+        if role:
+            await member.remove_roles(role)
 
 async def setup(bot):
     await bot.add_cog(RoleManagement(bot))
@@ -2,13 +2,21 @@ from discord.ext import commands
 from discord import app_commands
 from discord.ext import tasks
 
+DEPENDENCIES = ('db',)
+
 class Tasks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+
+    async def start_tasks(self):
         self.cleanup_task.start()
         self.reminder_check.start()
 
+    async def cog_unload(self):
+        self.cleanup_task.cancel()
+        self.reminder_check.cancel()
+
     @tasks.loop(hours=24)
     async def cleanup_task(self):
         """Daily cleanup of old data"""
@@ -1,30 +1,120 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 import logging
-from datetime import datetime, timedelta
-import asyncio
+from datetime import datetime, timedelta, timezone
+from utils.scheduler import DeadlineScheduler
+from utils.user_stats_store import UserStatsStore
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db',)
+
+PUNISHMENT_ACTIONS = ('ban', 'mute')
+# Discord caps member timeouts at 28 days
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60
+EXPIRY_MAX_ATTEMPTS = 5
+EXPIRY_RETRY_BASE = 60
+EXPIRY_RETRY_MAX = 3600
+
 class UserManagement(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.raid_protection = {}
-        self.user_stats = {}
-        self.load_stats()
-        
-    def load_stats(self):
+        state = bot.cog_state.get(__name__, {})
+        self.raid_protection = state.get('raid_protection', {})
+        self.db = bot.db
+        self.user_stats = UserStatsStore()
+        # Only expiry ids and due times are held in memory; rows are read when they fire
+        self.expiries = DeadlineScheduler(
+            self.expire_punishment,
+            name='punishment-expiry',
+            max_concurrency=5
+        )
+
+    async def cog_load(self):
+        await self.user_stats.load()
+        self.user_stats.start()
+        pending = await self.db.get_pending_punishments()
+        for row in pending:
+            self.expiries.schedule(row['id'], row['expires_at'])
+        logger.info(f"Loaded {len(pending)} pending punishment expiries")
+
+    async def start_tasks(self):
+        # Expiries need the guild cache, which is only filled once the bot is ready
+        self.expiries.start()
+
+    async def cog_unload(self):
+        if self.bot.is_reloading(__name__):
+            self.bot.cog_state[__name__] = {'raid_protection': self.raid_protection}
+        await self.expiries.stop()
+        await self.user_stats.close()
+
+    async def add_expiry(self, guild_id: int, user_id: int, action: str, reason: str,
+                         moderator_id: int, minutes: int) -> int:
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+        expiry_id, replaced = await self.db.add_punishment_expiry(
+            guild_id, user_id, action, reason, moderator_id, expires_at
+        )
+        for old_id in replaced:
+            self.expiries.cancel(old_id)
+        self.expiries.schedule(expiry_id, expires_at)
+        return expiry_id
+
+    async def discard_expiry(self, expiry_id: int):
+        """Forget an expiry whose punishment could not be applied"""
+        self.expiries.cancel(expiry_id)
         try:
-            with open('data/user_stats.json', 'r') as f:
-                self.user_stats = json.load(f)
-        except FileNotFoundError:
-            self.user_stats = {}
-            
-    def save_stats(self):
-        with open('data/user_stats.json', 'w') as f:
-            json.dump(self.user_stats, f, indent=4)
+            await self.db.delete_punishment_expiry(expiry_id)
+        except Exception as e:
+            logger.error(f"Failed to delete unused punishment expiry {expiry_id}: {e}")
+
+    async def lift_punishment(self, row) -> bool:
+        """Undo a punishment; False means it should be retried later"""
+        guild = self.bot.get_guild(row['guild_id'])
+        if guild is None:
+            # Not ready yet or the guild is unavailable
+            return False
+
+        try:
+            if row['action'] == 'ban':
+                await guild.unban(discord.Object(id=row['user_id']), reason="Temporary ban expired")
+            else:
+                member = guild.get_member(row['user_id'])
+                if member and member.is_timed_out():
+                    await member.timeout(None, reason="Temporary mute expired")
+        except discord.NotFound:
+            # Already unbanned or the member left
+            pass
+        except discord.Forbidden as e:
+            logger.error(f"Missing permissions to lift {row['action']} {row['id']} in {guild.id}: {e}")
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to lift {row['action']} {row['id']} in {guild.id}: {e}")
+            return False
+        return True
+
+    async def expire_punishment(self, expiry_id: int):
+        row = await self.db.get_punishment_expiry(expiry_id)
+        if row is None:
+            # Cancelled since it was scheduled
+            return
+
+        if await self.lift_punishment(row):
+            await self.db.delete_punishment_expiry(expiry_id)
+            return
+
+        attempts = row['attempts'] + 1
+        if attempts >= EXPIRY_MAX_ATTEMPTS:
+            logger.error(
+                f"Giving up on {row['action']} expiry {expiry_id} for user {row['user_id']} "
+                f"in {row['guild_id']} after {attempts} attempts"
+            )
+            await self.db.delete_punishment_expiry(expiry_id)
+            return
+
+        delay = min(EXPIRY_RETRY_BASE * 2 ** (attempts - 1), EXPIRY_RETRY_MAX)
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        await self.db.retry_punishment_expiry(expiry_id, attempts, retry_at)
+        self.expiries.schedule(expiry_id, retry_at)
 
     @app_commands.command(name="tempban", description="Temporarily ban a user")
     @app_commands.default_permissions(ban_members=True)
@@ -36,16 +126,32 @@ class UserManagement(commands.Cog):
         reason: str = None
     ):
         """Duration in minutes"""
-        await user.ban(reason=f"Temporary ban: {reason}")
-        
-        # Schedule unban
+        if duration <= 0:
+            await interaction.response.send_message("Duration must be positive.", ephemeral=True)
+            return
+
+        # Store the expiry first: a ban without one would silently become permanent
+        try:
+            expiry_id = await self.add_expiry(interaction.guild_id, user.id, 'ban', reason, interaction.user.id, duration)
+        except Exception as e:
+            logger.error(f"Failed to store tempban expiry for {user.id} in {interaction.guild_id}: {e}")
+            await interaction.response.send_message(
+                "Could not record the ban's expiry, so the user was not banned. Try again later.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            await user.ban(reason=f"Temporary ban: {reason}")
+        except discord.HTTPException as e:
+            await self.discard_expiry(expiry_id)
+            await interaction.response.send_message(f"Failed to ban {user.mention}: {e}", ephemeral=True)
+            return
+
         await interaction.response.send_message(
             f"{user.mention} has been banned for {duration} minutes.\nReason: {reason}",
             ephemeral=True
         )
-        
-        await asyncio.sleep(duration * 60)
-        await interaction.guild.unban(user, reason="Temporary ban expired")
 
     @app_commands.command(name="tempmute", description="Temporarily mute a user")
     @app_commands.default_permissions(moderate_members=True)
@@ -57,35 +163,97 @@ class UserManagement(commands.Cog):
         reason: str = None
     ):
         """Duration in minutes"""
-        await user.timeout(
-            duration=timedelta(minutes=duration),
-            reason=reason
-        )
-        
+        if not 0 < duration <= MAX_TIMEOUT_MINUTES:
+            await interaction.response.send_message(
+                f"Duration must be between 1 and {MAX_TIMEOUT_MINUTES} minutes.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            expiry_id = await self.add_expiry(interaction.guild_id, user.id, 'mute', reason, interaction.user.id, duration)
+        except Exception as e:
+            logger.error(f"Failed to store tempmute expiry for {user.id} in {interaction.guild_id}: {e}")
+            await interaction.response.send_message(
+                "Could not record the mute's expiry, so the user was not muted. Try again later.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            await user.timeout(
+                timedelta(minutes=duration),
+                reason=reason
+            )
+        except discord.HTTPException as e:
+            await self.discard_expiry(expiry_id)
+            await interaction.response.send_message(f"Failed to mute {user.mention}: {e}", ephemeral=True)
+            return
+
         await interaction.response.send_message(
             f"{user.mention} has been muted for {duration} minutes.\nReason: {reason}",
             ephemeral=True
         )
 
+    @app_commands.command(name="punishments", description="List pending temporary bans and mutes")
+    @app_commands.default_permissions(ban_members=True)
+    async def list_punishments(self, interaction: discord.Interaction):
+        rows = await self.db.get_guild_punishments(interaction.guild_id, limit=20)
+        if not rows:
+            await interaction.response.send_message("No pending temporary punishments.", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="Pending Punishments",
+            color=discord.Color.orange()
+        )
+        lines = []
+        for row in rows:
+            expires = int(row['expires_at'].timestamp())
+            retry = f" (retry {row['attempts']})" if row['attempts'] else ""
+            lines.append(
+                f"`{row['id']}` {row['action']} <@{row['user_id']}> - expires <t:{expires}:R>{retry}"
+            )
+        embed.description = "\n".join(lines)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="cancelpunishment", description="Cancel a pending temporary ban or mute")
+    @app_commands.default_permissions(ban_members=True)
+    async def cancel_punishment(
+        self,
+        interaction: discord.Interaction,
+        punishment_id: int,
+        lift: bool = True
+    ):
+        """Lift the punishment now, or with lift=False keep it in place permanently"""
+        row = await self.db.delete_punishment_expiry(punishment_id, interaction.guild_id)
+        if row is None:
+            await interaction.response.send_message("Punishment not found.", ephemeral=True)
+            return
+        self.expiries.cancel(punishment_id)
+
+        if not lift:
+            await interaction.response.send_message(
+                f"The {row['action']} on <@{row['user_id']}> will no longer expire.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True)
+        if await self.lift_punishment(row):
+            await interaction.followup.send(f"Lifted {row['action']} on <@{row['user_id']}>.")
+        else:
+            await interaction.followup.send(
+                f"Couldn't lift the {row['action']} on <@{row['user_id']}>; it has been removed from the schedule."
+            )
+
     @app_commands.command(name="userinfo", description="Get information about a user")
     async def user_info(
         self,
         interaction: discord.Interaction,
         user: discord.Member
     ):
-        guild_id = str(interaction.guild_id)
-        user_id = str(user.id)
-        
-        if guild_id not in self.user_stats:
-            self.user_stats[guild_id] = {}
-        if user_id not in self.user_stats[guild_id]:
-            self.user_stats[guild_id][user_id] = {
-                "message_count": 0,
-                "last_active": None,
-                "join_date": user.joined_at.isoformat() if user.joined_at else None
-            }
-            
-        stats = self.user_stats[guild_id][user_id]
+        stats = self.user_stats.get(interaction.guild_id, user.id) or {"message_count": 0}
         
         embed = discord.Embed(
             title=f"User Information - {user.display_name}",
@@ -129,24 +297,16 @@ class UserManagement(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        if message.author.bot:
+        if message.author.bot or not message.guild:
             return
-            
-        guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
-        
-        if guild_id not in self.user_stats:
-            self.user_stats[guild_id] = {}
-        if user_id not in self.user_stats[guild_id]:
-            self.user_stats[guild_id][user_id] = {
-                "message_count": 0,
-                "last_active": None,
-                "join_date": message.author.joined_at.isoformat() if message.author.joined_at else None
-            }
-            
-        self.user_stats[guild_id][user_id]["message_count"] += 1
-        self.user_stats[guild_id][user_id]["last_active"] = datetime.utcnow().isoformat()
-        self.save_stats()
+
+        joined_at = getattr(message.author, 'joined_at', None)
+        self.user_stats.record_message(
+            message.guild.id,
+            message.author.id,
+            datetime.utcnow().isoformat(),
+            joined_at.isoformat() if joined_at else None
+        )
 
 async def setup(bot):
     await bot.add_cog(UserManagement(bot)) 
\ No newline at end of file
@@ -6,10 +6,13 @@ from typing import Optional
 
 logger = logging.getLogger('discord')
 
+DEPENDENCIES = ('db', 'config')
+
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
+        self.config = bot.config
         logger.info("Welcome cog initialized")
 
     @app_commands.command(name="setwelcome", description="Set welcome message settings")
@@ -23,7 +26,7 @@ class Welcome(commands.Cog):
         embed: bool = True
     ):
         try:
-            await self.db.set_welcome(
+            await self.config.set_welcome(
                 interaction.guild_id,
                 channel.id,
                 message,
@@ -52,20 +55,20 @@ class Welcome(commands.Cog):
 
     async def send_welcome_message(self, member):
         try:
-            settings = await self.db.get_welcome_settings(member.guild.id)
+            settings = await self.config.welcome_settings(member.guild.id)
             if not settings:
                 return
 
-            channel = member.guild.get_channel(settings['channel_id'])
+            channel = member.guild.get_channel(settings.channel_id)
             if not channel:
                 return
 
-            message = settings['welcome_message']
+            message = settings.welcome_message or ""
             message = message.replace('{user}', member.mention)
             message = message.replace('{server}', member.guild.name)
             message = message.replace('{count}', str(member.guild.member_count))
 
-            if settings['use_embed']:
+            if settings.use_embed:
                 embed = discord.Embed(
                     title=f"Welcome to {member.guild.name}!",
                     description=message,
@@ -75,9 +78,9 @@ class Welcome(commands.Cog):
             else:
                 await channel.send(message)
 
-            if settings['dm_message']:
+            if settings.dm_message:
                 try:
-                    dm_msg = settings['dm_message'].replace('{server}', member.guild.name)
+                    dm_msg = settings.dm_message.replace('{server}', member.guild.name)
                     await member.send(dm_msg)
                 except discord.Forbidden:
                     logger.warning(f"Could not send DM to {member}")
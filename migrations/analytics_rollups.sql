@@ -0,0 +1,34 @@
+CREATE TABLE IF NOT EXISTS analytics_user_hourly (
+    guild_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    channel_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    message_count INT DEFAULT 0,
+    PRIMARY KEY (guild_id, bucket, channel_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_channel_hourly (
+    guild_id BIGINT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    channel_id BIGINT NOT NULL,
+    message_count INT DEFAULT 0,
+    PRIMARY KEY (guild_id, bucket, channel_id)
+);
+
+-- One-time backfill from raw message events recorded before the rollups existed
+INSERT INTO analytics_user_hourly (guild_id, bucket, channel_id, user_id, message_count)
+SELECT guild_id, date_trunc('hour', timestamp), target_id,
+       (additional_data->>'user_id')::BIGINT, SUM(count)::INT
+FROM analytics_data
+WHERE data_type = 'message' AND additional_data->>'user_id' IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (guild_id, bucket, channel_id, user_id)
+DO UPDATE SET message_count = EXCLUDED.message_count;
+
+INSERT INTO analytics_channel_hourly (guild_id, bucket, channel_id, message_count)
+SELECT guild_id, date_trunc('hour', timestamp), target_id, SUM(count)::INT
+FROM analytics_data
+WHERE data_type = 'message'
+GROUP BY 1, 2, 3
+ON CONFLICT (guild_id, bucket, channel_id)
+DO UPDATE SET message_count = EXCLUDED.message_count;
@@ -0,0 +1,63 @@
+-- Base tables, previously created by DatabaseManager.init_tables on every connect
+
+CREATE TABLE IF NOT EXISTS warnings (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    moderator_id BIGINT NOT NULL,
+    reason TEXT,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    INDEX (guild_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS analytics (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    message_count INT DEFAULT 0,
+    event_type TEXT,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    INDEX (guild_id, channel_id)
+);
+
+CREATE TABLE IF NOT EXISTS welcome_settings (
+    guild_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    welcome_message TEXT,
+    dm_message TEXT,
+    use_embed BOOLEAN DEFAULT true
+);
+
+CREATE TABLE IF NOT EXISTS custom_commands (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    command_name TEXT NOT NULL,
+    response TEXT NOT NULL,
+    description TEXT,
+    created_by BIGINT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (guild_id, command_name)
+);
+
+CREATE TABLE IF NOT EXISTS reaction_roles (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    role_id BIGINT NOT NULL,
+    emoji TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (message_id, emoji)
+);
+
+CREATE TABLE IF NOT EXISTS analytics_data (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    data_type TEXT NOT NULL,
+    target_id BIGINT NOT NULL,
+    count INTEGER DEFAULT 0,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    additional_data JSONB,
+    INDEX (guild_id, data_type, target_id)
+);
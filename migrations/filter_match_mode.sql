@@ -0,0 +1 @@
+ALTER TABLE filter_patterns ADD COLUMN IF NOT EXISTS match_mode TEXT DEFAULT 'word';
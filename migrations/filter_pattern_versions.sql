@@ -0,0 +1,7 @@
+-- Bumped on every pattern change so other bot processes know to reload that guild
+CREATE TABLE IF NOT EXISTS filter_pattern_versions (
+    guild_id BIGINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    INDEX (updated_at)
+);
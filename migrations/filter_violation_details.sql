@@ -0,0 +1,5 @@
+-- filter_settings.sql created a slimmer filter_violations table; make sure the detail columns exist
+ALTER TABLE filter_violations ADD COLUMN IF NOT EXISTS message_content TEXT;
+ALTER TABLE filter_violations ADD COLUMN IF NOT EXISTS matched_pattern TEXT;
+ALTER TABLE filter_violations ADD COLUMN IF NOT EXISTS category TEXT;
+ALTER TABLE filter_violations ADD COLUMN IF NOT EXISTS action_taken TEXT;
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS levels (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    xp BIGINT DEFAULT 0,
+    level INT DEFAULT 0,
+    message_count BIGINT DEFAULT 0,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (guild_id, user_id),
+    INDEX (guild_id, xp DESC)
+);
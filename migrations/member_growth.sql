@@ -0,0 +1,25 @@
+CREATE TABLE IF NOT EXISTS member_events (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    event_type TEXT NOT NULL, -- 'join', 'leave'
+    joined_at TIMESTAMP WITH TIME ZONE,
+    occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    INDEX (guild_id, occurred_at)
+);
+
+-- One row per guild and UTC day; cohort_departed counts leavers by the day they joined
+CREATE TABLE IF NOT EXISTS member_growth_daily (
+    guild_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    joins INT DEFAULT 0,
+    leaves INT DEFAULT 0,
+    member_count INT,
+    cohort_departed INT DEFAULT 0,
+    PRIMARY KEY (guild_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS member_growth_backfills (
+    guild_id BIGINT PRIMARY KEY,
+    completed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,13 @@
+CREATE TABLE IF NOT EXISTS punishment_expiries (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    action TEXT NOT NULL, -- 'ban', 'mute'
+    reason TEXT,
+    moderator_id BIGINT,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    attempts INT DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    INDEX (guild_id, user_id),
+    INDEX (expires_at)
+);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS scheduled_announcements (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    title TEXT,
+    content TEXT,
+    schedule_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    -- First occurrence; monthly repeats are computed from it so month-end dates don't drift
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    repeat_type TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,43 @@
+import asyncio
+import csv
+import time
+
+import pytest
+
+from utils.csv_stream import MAX_RECORD_CHARS, iter_csv_rows
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def parse(data: bytes, size: int = 7):
+    async def collect():
+        return [row async for row in iter_csv_rows(_chunks(data, size))]
+    return asyncio.run(collect())
+
+def test_quoted_newlines_across_chunks():
+    data = 'pattern,description\r\nfoo,"line one\nline ""two"""\nbar,plain\n'.encode()
+    for size in (1, 3, 7, 64):
+        assert parse(data, size) == [
+            {'pattern': 'foo', 'description': 'line one\nline "two"'},
+            {'pattern': 'bar', 'description': 'plain'},
+        ]
+
+def test_unbalanced_quote_is_rejected_quickly():
+    rows = ''.join(f"word{i},row {i}\n" for i in range(100000))
+    data = f'pattern,description\nbad,"oops\n{rows}'.encode()
+    assert len(data) > 1_000_000
+    start = time.perf_counter()
+    with pytest.raises(csv.Error):
+        parse(data, 64 * 1024)
+    assert time.perf_counter() - start < 1.0
+
+def test_unterminated_field_at_end_of_file():
+    with pytest.raises(csv.Error):
+        parse(b'pattern,description\nbad,"oops\n')
+
+def test_long_quoted_field_under_the_cap():
+    text = 'x' * (MAX_RECORD_CHARS // 2)
+    assert parse(f'pattern,description\nfoo,"{text}"\n'.encode(), 4096) == [
+        {'pattern': 'foo', 'description': text}
+    ]
@@ -0,0 +1,32 @@
+import pytest
+
+from utils.regex_safety import analyze_pattern
+
+@pytest.mark.parametrize('pattern', [
+    r'(a+)+b',
+    r'(a|a)*b',
+    r'a*a*a*a*a*b',
+    r'\d*\d*\d*\d*x',
+    r'.*.*=.*',
+    r'(?:a|b)*\w*\w*c',
+    r'a*(a*)b',
+    r'\w+\s?\w+x',
+])
+def test_rejects_backtracking_patterns(pattern):
+    assert not analyze_pattern(pattern).safe
+
+@pytest.mark.parametrize('pattern', [
+    r'badword',
+    r'f[o0]+bar',
+    r'a*ba*c',
+    r'\d+\s+\w+',
+    r'(?:ab)*b*',
+    r'https?://\S+',
+    r'n[i1!]gg(?:a|er)s?',
+    r'(?>a*)a*b',
+])
+def test_accepts_linear_patterns(pattern):
+    assert analyze_pattern(pattern).safe
+
+def test_backreferences_are_isolated():
+    assert analyze_pattern(r'(\w)\1{3,}').isolated
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Cold-start import budget in seconds, per cog and for all cogs together
+COG_IMPORT_BUDGET = float(os.getenv('COG_IMPORT_BUDGET', 1.5))
+TOTAL_IMPORT_BUDGET = float(os.getenv('TOTAL_IMPORT_BUDGET', 4.0))
+
+ROOT = Path(__file__).parent
+
+# Runs in a fresh interpreter so nothing is already in sys.modules
+MEASURE = """
+import importlib, sys, time
+try:
+    import discord, discord.ext.commands  # the bot pays for these regardless of cogs
+except ModuleNotFoundError as e:
+    print('MISSING', e.name)
+    sys.exit()
+for name in sys.argv[1:]:
+    start = time.perf_counter()
+    try:
+        importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        print('MISSING', e.name)
+        continue
+    print(name, time.perf_counter() - start)
+"""
+
+def cog_modules():
+    return sorted(
+        f"cogs.{path.stem}" for path in (ROOT / 'cogs').glob('*.py')
+        if not path.name.startswith('__')
+    )
+
+def measure_imports():
+    result = subprocess.run(
+        [sys.executable, '-c', MEASURE, *cog_modules()],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    missing = set()
+    for line in result.stdout.splitlines():
+        name, value = line.split()
+        if name == 'MISSING':
+            missing.add(value)
+        else:
+            timings[name] = float(value)
+    return timings, missing
+
+def test_cog_import_budget():
+    timings, missing = measure_imports()
+    if missing:
+        # Without the bot's dependencies installed there is nothing meaningful to time
+        pytest.skip(f"dependencies not installed: {', '.join(sorted(missing))}")
+    slow = {name: seconds for name, seconds in timings.items() if seconds > COG_IMPORT_BUDGET}
+    assert not slow, f"Cogs over the {COG_IMPORT_BUDGET}s import budget: {slow}"
+    total = sum(timings.values())
+    assert total <= TOTAL_IMPORT_BUDGET, f"Cog imports took {total:.2f}s, budget is {TOTAL_IMPORT_BUDGET}s"
+
+if __name__ == "__main__":
+    for name, seconds in sorted(measure_imports()[0].items(), key=lambda item: -item[1]):
+        print(f"{name:<24} {seconds * 1000:8.1f}ms")
+    test_cog_import_budget()
+    print("Import budget OK")
@@ -0,0 +1,73 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+class AhoCorasick:
+    """Multi-pattern string matcher that scans text once in linear time"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[Tuple[int, Any]] = []
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def node_count(self) -> int:
+        return len(self._goto)
+
+    def add(self, word: str, value: Any):
+        """Insert a pattern; value is handed back with every match"""
+        if not word:
+            return
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self._patterns))
+        self._patterns.append((len(word), value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque()
+        for state in goto[0].values():
+            fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, value) for every occurrence, overlaps included"""
+        if not self._built:
+            self.build()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for pattern_id in out[state]:
+                    length, value = patterns[pattern_id]
+                    yield end - length, end, value
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Discord merges repeated entries of these actions (same moderator, target and
+# channel) into one whose extra.count goes up while created_at stays the same
+COUNTED_ACTIONS = (discord.AuditLogAction.message_delete,)
+
+# On a guild's first fetch, entries this much older than the triggering event
+# are treated as already accounted for
+NEW_ENTRY_SLACK = timedelta(seconds=5)
+
+@dataclass
+class AuditRecord:
+    id: int
+    action: discord.AuditLogAction
+    target_id: Optional[int]
+    user: Any
+    reason: Optional[str]
+    created_at: datetime
+    channel_id: Optional[int] = None
+    # Merged count as last fetched, and how many of its increments no event has claimed
+    count: Optional[int] = None
+    unclaimed: int = 0
+    updated_at: Optional[datetime] = None
+    user_id: Optional[int] = None
+
+    @property
+    def user_mention(self) -> Optional[str]:
+        """Who performed the action, even when they aren't in the member cache"""
+        if self.user is not None:
+            return self.user.mention
+        return f"<@{self.user_id}>" if self.user_id else None
+
+class _GuildAudit:
+    def __init__(self):
+        # (action, target_id) -> newest first
+        self.entries: Dict[Tuple[discord.AuditLogAction, int], List[AuditRecord]] = {}
+        self.by_id: Dict[int, AuditRecord] = {}
+        self.last_id: Optional[int] = None
+        self.refresh: Optional[asyncio.Task] = None
+        self.refreshed_at = 0.0
+        self.recount = False
+        self.first_requested: Optional[datetime] = None
+
+class AuditLogCache:
+    """Per-guild audit log entries fetched in pages and indexed by (action, target)"""
+
+    def __init__(self, ttl: float = 120.0, coalesce_delay: float = 1.0,
+                 page_size: int = 100, max_pages: int = 3):
+        self.ttl = ttl
+        # Audit entries land slightly after the gateway event, and waiting lets a
+        # burst of events share one fetch
+        self.coalesce_delay = coalesce_delay
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._guilds: Dict[int, _GuildAudit] = {}
+
+        # Metrics
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, state: _GuildAudit, action: discord.AuditLogAction, target_id: int,
+                since: datetime, channel_id: Optional[int]) -> Optional[AuditRecord]:
+        counted = action in COUNTED_ACTIONS
+        for record in state.entries.get((action, target_id), ()):
+            if record.updated_at < since:
+                continue
+            if channel_id is not None and record.channel_id not in (None, channel_id):
+                continue
+            if counted:
+                # Each increment of a merged entry accounts for exactly one event
+                if record.unclaimed <= 0:
+                    continue
+                record.unclaimed -= 1
+            return record
+        return None
+
+    async def resolve(self, guild: discord.Guild, action: discord.AuditLogAction,
+                      target_id: int, max_age: float = 30.0,
+                      channel_id: Optional[int] = None) -> Optional[AuditRecord]:
+        """Newest entry for `target_id` no older than `max_age` seconds, fetching if needed"""
+        if not guild.me or not guild.me.guild_permissions.view_audit_log:
+            return None
+
+        state = self._guilds.get(guild.id)
+        if state is None:
+            state = self._guilds[guild.id] = _GuildAudit()
+            state.first_requested = datetime.now(timezone.utc)
+
+        since = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+        record = self._lookup(state, action, target_id, since, channel_id)
+        if record:
+            self.hits += 1
+            return record
+
+        # A fetch that is still waiting out its delay will include this event;
+        # one already sending its request may not, so queue another after it
+        requested = time.monotonic()
+        while True:
+            if action in COUNTED_ACTIONS:
+                state.recount = True
+            if state.refresh is None or state.refresh.done():
+                state.refresh = asyncio.create_task(self._refresh(guild, state))
+            await asyncio.shield(state.refresh)
+            if state.refreshed_at >= requested:
+                break
+
+        record = self._lookup(state, action, target_id, since, channel_id)
+        if record:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return record
+
+    async def _fetch(self, guild: discord.Guild, limit: int, stop_id: Optional[int] = None,
+                     action: Optional[discord.AuditLogAction] = None) -> list:
+        """Newest-first entries, stopping at `stop_id` so only what is new gets paged in"""
+        # discord.py only accepts the action filter when it is actually given
+        history = guild.audit_logs(limit=limit, action=action) if action else guild.audit_logs(limit=limit)
+        fetched = []
+        try:
+            async for entry in history:
+                if stop_id is not None and entry.id <= stop_id:
+                    break
+                fetched.append(entry)
+        except discord.HTTPException as e:
+            logger.warning(f"Audit log fetch failed for guild {guild.id}: {e}")
+        self.requests += max(1, -(-len(fetched) // 100))
+        return fetched
+
+    async def _refresh(self, guild: discord.Guild, state: _GuildAudit):
+        await asyncio.sleep(self.coalesce_delay)
+        state.refreshed_at = time.monotonic()
+        recount, state.recount = state.recount, False
+
+        # Entries above this id appeared after the previous fetch
+        known_id = state.last_id
+        fetched = await self._fetch(guild, self.page_size * self.max_pages, stop_id=known_id)
+        if recount:
+            # Merged entries keep their id, so only re-reading them shows a higher count
+            for action in COUNTED_ACTIONS:
+                fetched += await self._fetch(guild, self.page_size, action=action)
+
+        now = datetime.now(timezone.utc)
+        for entry in fetched:
+            self._ingest(state, entry, known_id, now)
+        self._prune(state)
+
+    def _ingest(self, state: _GuildAudit, entry, known_id: Optional[int], now: datetime):
+        count = getattr(entry.extra, 'count', None)
+        record = state.by_id.get(entry.id)
+        if record is not None:
+            if count is not None and record.count is not None and count > record.count:
+                record.unclaimed += count - record.count
+                record.count = count
+                record.updated_at = now
+            return
+
+        target_id = getattr(entry.target, 'id', None)
+        if target_id is None:
+            return
+        if known_id is not None:
+            is_new = entry.id > known_id
+        else:
+            is_new = entry.created_at >= state.first_requested - NEW_ENTRY_SLACK
+        extra_channel = getattr(entry.extra, 'channel', None)
+        record = AuditRecord(
+            id=entry.id,
+            action=entry.action,
+            target_id=target_id,
+            user=entry.user,
+            user_id=getattr(entry, 'user_id', None),
+            reason=entry.reason,
+            created_at=entry.created_at,
+            channel_id=getattr(extra_channel, 'id', None),
+            count=count,
+            # An entry first seen after it was merged can't say which increments are new
+            unclaimed=(count or 1) if is_new else 0,
+            updated_at=entry.created_at
+        )
+        state.by_id[entry.id] = record
+        bucket = state.entries.setdefault((entry.action, target_id), [])
+        bucket.append(record)
+        bucket.sort(key=lambda r: r.id, reverse=True)
+        state.last_id = max(state.last_id or 0, entry.id)
+
+    def _prune(self, state: _GuildAudit):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        for key in list(state.entries):
+            fresh = [record for record in state.entries[key] if record.updated_at >= cutoff]
+            if fresh:
+                state.entries[key] = fresh
+            else:
+                del state.entries[key]
+        state.by_id = {record.id: record for bucket in state.entries.values() for record in bucket}
+
+    def discard(self, guild_id: int):
+        state = self._guilds.pop(guild_id, None)
+        if state and state.refresh and not state.refresh.done():
+            state.refresh.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'guilds': len(self._guilds),
+            'entries': sum(len(bucket) for state in self._guilds.values() for bucket in state.entries.values()),
+            'requests': self.requests,
+            'hits': self.hits,
+            'misses': self.misses
+        }
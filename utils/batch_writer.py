@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger('discord')
+
+class BatchWriter:
+    """Write-behind buffer that hands queued rows to a bulk flush callback"""
+
+    def __init__(self, name: str, flush_callback: Callable[[List[Any]], Awaitable[None]],
+                 max_batch: int = 500, flush_interval: float = 5.0, max_queue: int = 50000):
+        self.name = name
+        self.flush_callback = flush_callback
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self._buffer: List[Any] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._failed_at: Optional[float] = None
+
+        # Metrics
+        self.rows_flushed = 0
+        self.rows_dropped = 0
+        self.flush_count = 0
+        self.flush_failures = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        """Start the background flush loop"""
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    def add(self, row: Any):
+        """Queue a row; never blocks the caller"""
+        if self._closed:
+            self.rows_dropped += 1
+            return
+
+        self._buffer.append(row)
+        self._trim()
+        if len(self._buffer) >= self.max_batch and not self._backing_off():
+            self._wakeup.set()
+
+    def _backing_off(self) -> bool:
+        # After a failed flush a full buffer must not wake the loop on every add,
+        # so retries wait for the regular interval instead of hammering the database
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.flush_interval
+
+    def _trim(self):
+        # Drop the oldest rows rather than growing without bound while the database is down
+        overflow = len(self._buffer) - self.max_queue
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.rows_dropped += overflow
+            logger.warning(f"{self.name} buffer full, dropped {overflow} rows")
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> bool:
+        """Flush everything queued so far in batches of max_batch"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.max_batch]
+                del self._buffer[:self.max_batch]
+
+                start = time.perf_counter()
+                try:
+                    await self.flush_callback(batch)
+                except Exception as e:
+                    self.flush_failures += 1
+                    self._failed_at = time.monotonic()
+                    logger.error(f"{self.name} flush of {len(batch)} rows failed: {e}")
+                    # Put the batch back in front so it is retried on the next tick
+                    self._buffer[:0] = batch
+                    self._trim()
+                    return False
+
+                latency = time.perf_counter() - start
+                self._failed_at = None
+                self.flush_count += 1
+                self.rows_flushed += len(batch)
+                self.last_flush_latency = latency
+                self.max_flush_latency = max(self.max_flush_latency, latency)
+                logger.debug(f"{self.name} flushed {len(batch)} rows in {latency * 1000:.1f}ms")
+        return True
+
+    async def close(self):
+        """Stop the flush loop and write out whatever is still queued"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task and not self._task.done():
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if not await self.flush():
+            logger.error(f"{self.name} lost {len(self._buffer)} rows on shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue_depth,
+            'rows_flushed': self.rows_flushed,
+            'rows_dropped': self.rows_dropped,
+            'flush_count': self.flush_count,
+            'flush_failures': self.flush_failures,
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 2),
+            'max_flush_latency_ms': round(self.max_flush_latency * 1000, 2)
+        }
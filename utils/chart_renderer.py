@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import io
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import date
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+@lru_cache(maxsize=None)
+def plotting():
+    """matplotlib and seaborn cost seconds to import, so only processes that draw pay for them"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set_theme(style='darkgrid')
+    return plt, sns
+
+def _png(fig) -> bytes:
+    plt, _ = plotting()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def _render_hourly(data: Dict[str, Any]) -> bytes:
+    plt, sns = plotting()
+    fig, ax = plt.subplots(figsize=(10, 4))
+    sns.barplot(x=list(range(24)), y=data['counts'], color='#5865F2', ax=ax)
+    ax.set_title(data.get('title', 'Messages per hour'))
+    ax.set_xlabel(f"Hour ({data.get('timezone', 'UTC')})")
+    ax.set_ylabel('Messages')
+    return _png(fig)
+
+def _render_heatmap(data: Dict[str, Any]) -> bytes:
+    plt, sns = plotting()
+    fig, ax = plt.subplots(figsize=(12, 4))
+    sns.heatmap(
+        data['matrix'], ax=ax, cmap='rocket_r', linewidths=0.5,
+        xticklabels=list(range(24)), yticklabels=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    )
+    ax.set_title(data.get('title', 'Activity'))
+    ax.set_xlabel(f"Hour ({data.get('timezone', 'UTC')})")
+    ax.set_ylabel('')
+    return _png(fig)
+
+def _render_growth(data: Dict[str, Any]) -> bytes:
+    plt, _ = plotting()
+    days = [date.fromisoformat(day) for day in data['days']]
+    fig, (count_ax, flow_ax) = plt.subplots(2, 1, figsize=(10, 6), sharex=True, gridspec_kw={'height_ratios': [2, 1]})
+
+    known = [(day, count) for day, count in zip(days, data['member_count']) if count is not None]
+    if known:
+        count_ax.plot([day for day, _ in known], [count for _, count in known], color='#5865F2')
+    count_ax.set_title(data.get('title', 'Member growth'))
+    count_ax.set_ylabel('Members')
+
+    flow_ax.bar(days, data['joins'], color='#57F287', label='Joins')
+    flow_ax.bar(days, [-leaves for leaves in data['leaves']], color='#ED4245', label='Leaves')
+    flow_ax.axhline(0, color='grey', linewidth=0.5)
+    flow_ax.legend(loc='upper left')
+    fig.autofmt_xdate()
+    return _png(fig)
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], bytes]] = {
+    'hourly': _render_hourly,
+    'heatmap': _render_heatmap,
+    'growth': _render_growth
+}
+
+def render_chart(chart: str, data: Dict[str, Any]) -> bytes:
+    """Entry point for worker processes: draw one chart and return PNG bytes"""
+    return RENDERERS[chart](data)
+
+def data_version(data: Any) -> str:
+    """Digest of the chart input; the same data always maps to the same cached PNG"""
+    return hashlib.blake2b(pickle.dumps(data, protocol=4), digest_size=16).hexdigest()
+
+class ChartRenderer:
+    """Renders charts in an executor, memoizes PNGs and shares in-flight work between callers"""
+
+    def __init__(self, executor: Optional[Executor] = None,
+                 max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.executor = executor
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (guild_id, chart, timeframe, version) -> PNG bytes
+        self._pngs: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Only the newest version of each chart is worth keeping
+        self._latest: Dict[Tuple, Tuple] = {}
+        # (guild_id, chart, timeframe) -> task loading data and rendering
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+
+        # Metrics
+        self.renders = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.render_seconds = 0.0
+
+    async def render(self, guild_id: int, chart: str, timeframe: str,
+                     load_data: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[bytes, Dict[str, Any]]:
+        """PNG and the data it was drawn from; identical concurrent requests share one load and render"""
+        request = (guild_id, chart, timeframe)
+        task = self._inflight.get(request)
+        if task:
+            self.coalesced += 1
+        else:
+            task = self._inflight[request] = asyncio.create_task(self._load_and_render(request, load_data))
+            task.add_done_callback(lambda _: self._inflight.pop(request, None))
+        return await asyncio.shield(task)
+
+    async def _load_and_render(self, request: Tuple, load_data) -> Tuple[bytes, Dict[str, Any]]:
+        data = await load_data()
+        key = (*request, data_version(data))
+        png = self._pngs.get(key)
+        if png is not None:
+            self._pngs.move_to_end(key)
+            self.hits += 1
+            return png, data
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(self.executor, render_chart, request[1], data)
+        elapsed = time.perf_counter() - start
+        self.renders += 1
+        self.render_seconds += elapsed
+        logger.debug(f"Rendered {request[1]} chart for guild {request[0]} in {elapsed * 1000:.0f}ms")
+
+        self._store(key, png)
+        return png, data
+
+    def _store(self, key: Tuple, png: bytes):
+        previous = self._latest.get(key[:3])
+        if previous in self._pngs:
+            self._bytes -= len(self._pngs.pop(previous))
+        self._latest[key[:3]] = key
+
+        self._pngs[key] = png
+        self._bytes += len(png)
+        while len(self._pngs) > self.max_entries or self._bytes > self.max_bytes:
+            evicted_key, evicted = self._pngs.popitem(last=False)
+            self._bytes -= len(evicted)
+            if self._latest.get(evicted_key[:3]) == evicted_key:
+                del self._latest[evicted_key[:3]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'cached': len(self._pngs),
+            'bytes': self._bytes,
+            'renders': self.renders,
+            'hits': self.hits,
+            'coalesced': self.coalesced,
+            'avg_render_ms': round(self.render_seconds / self.renders * 1000, 1) if self.renders else 0
+        }
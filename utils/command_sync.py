@@ -0,0 +1,57 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger('discord')
+
+SYNC_STATE_PATH = 'data/command_sync.json'
+
+def tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Stable digest of the command payloads Discord would receive for this scope"""
+    payloads = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payloads.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py < 2.4 takes no tree argument
+            payloads.append(command.to_dict())
+    payloads.sort(key=lambda payload: (payload.get('type', 1), payload['name']))
+    encoded = json.dumps(payloads, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+def load_sync_state(path: str = SYNC_STATE_PATH) -> Dict[str, str]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_sync_state(state: Dict[str, str], path: str = SYNC_STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, path)
+
+async def sync_if_changed(tree: app_commands.CommandTree, application_id: int,
+                          guild: Optional[discord.abc.Snowflake] = None,
+                          force: bool = False, path: str = SYNC_STATE_PATH) -> bool:
+    """Sync one scope only when its definitions differ from the last successful sync"""
+    scope = f"{application_id}:{guild.id if guild else 'global'}"
+    digest = tree_hash(tree, guild=guild)
+    state = load_sync_state(path)
+
+    if not force and state.get(scope) == digest:
+        logger.info(f"Commands unchanged for {scope}, skipping sync")
+        return False
+
+    synced = await tree.sync(guild=guild)
+    state[scope] = digest
+    save_sync_state(state, path)
+    logger.info(f"Synced {len(synced)} commands for {scope}")
+    return True
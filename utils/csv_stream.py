@@ -0,0 +1,60 @@
+import codecs
+import csv
+import io
+from typing import AsyncIterator, Dict, List, Tuple
+
+# A record still open after this many characters is almost always an unbalanced quote
+MAX_RECORD_CHARS = 64 * 1024
+
+def _complete_records_end(text: str, start: int = 0, quoted: bool = False) -> Tuple[int, bool]:
+    """Offset just past the last newline outside a quoted field (or 0), and whether
+    text ends inside one; `quoted` is the state at `start`, so each character is scanned once"""
+    end = 0
+    offset = start
+    for i, part in enumerate(text[start:].split('"')):
+        if i:
+            # Every quote flips the state; an escaped "" flips it twice
+            quoted = not quoted
+            offset += 1
+        if not quoted:
+            newline = part.rfind('\n')
+            if newline != -1:
+                end = offset + newline + 1
+        offset += len(part)
+    return end, quoted
+
+def _records(block: str) -> List[List[str]]:
+    return [record for record in csv.reader(io.StringIO(block)) if any(record)]
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, str]]:
+    """Parse a CSV byte stream with a header row into dicts, one block of records at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    header = None
+    pending = ''
+    quoted = False
+
+    async for chunk in chunks:
+        scanned = len(pending)
+        pending += decoder.decode(chunk)
+        cut, quoted = _complete_records_end(pending, scanned, quoted)
+        if not cut:
+            if len(pending) > MAX_RECORD_CHARS:
+                raise csv.Error(f"record longer than {MAX_RECORD_CHARS} characters (unbalanced quote?)")
+            continue
+        block, pending = pending[:cut], pending[cut:]
+        for record in _records(block):
+            if header is None:
+                header = [name.strip() for name in record]
+                continue
+            yield dict(zip(header, record))
+
+    scanned = len(pending)
+    pending += decoder.decode(b'', final=True)
+    _, quoted = _complete_records_end(pending, scanned, quoted)
+    if quoted:
+        raise csv.Error("unterminated quoted field at end of file")
+    for record in _records(pending):
+        if header is None:
+            header = [name.strip() for name in record]
+            continue
+        yield dict(zip(header, record))
@@ -1,113 +1,115 @@
 import asyncpg
+import copy
 import logging
 from typing import Optional, Dict, List, Any
 import os
+import json
+import ssl as ssl_module
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from datetime import datetime
+from functools import lru_cache
+from utils.metrics import LatencyTracker
 
 logger = logging.getLogger('discord')
 
+# automod_settings columns and their defaults (see migrations/automod.sql)
+AUTOMOD_DEFAULTS = {
+    'spam_threshold': 5,
+    'spam_window_seconds': 5,
+    'max_mentions': 5,
+    'link_filter': False,
+    'caps_threshold': 70,
+    'warn_threshold': 3,
+    'action_type': 'warn',
+    'exempt_roles': [],
+    'exempt_channels': []
+}
+
+@lru_cache(maxsize=128)
+def _automod_upsert_sql(columns: tuple) -> str:
+    """Same column set, same SQL text, so asyncpg reuses its prepared statement"""
+    placeholders = ', '.join(f"${i + 2}" for i in range(len(columns)))
+    updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns)
+    return f"""
+        INSERT INTO automod_settings (guild_id, {', '.join(columns)})
+        VALUES ($1, {placeholders})
+        ON CONFLICT (guild_id) DO UPDATE SET {updates}
+    """
+
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, dsn: Optional[str] = None, ssl: Optional[ssl_module.SSLContext] = None,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 statement_cache_size: int = 256):
         load_dotenv()
         self.pool = None
-        self.dsn = os.getenv('DATABASE_URL')  # CockroachDB connection string
+        self.dsn = dsn or os.getenv('DATABASE_URL')  # CockroachDB connection string
+        self.ssl = ssl
+        self.min_size = min_size or int(os.getenv('DB_POOL_MIN', 5))
+        self.max_size = max_size or int(os.getenv('DB_POOL_MAX', 20))
+        # asyncpg prepares each distinct query text once per connection and reuses it
+        self.statement_cache_size = statement_cache_size
+        self.pool_wait = LatencyTracker()
+        self.query_time = LatencyTracker()
 
     async def connect(self):
+        """Open the pool; schema changes live in migrations/ and are not applied here"""
         try:
             self.pool = await asyncpg.create_pool(
                 dsn=self.dsn,
-                min_size=5,
-                max_size=20
+                ssl=self.ssl,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                max_inactive_connection_lifetime=300
             )
-            await self.init_tables()
-            logger.info("Successfully connected to CockroachDB")
+            logger.info(f"Successfully connected to CockroachDB (pool {self.min_size}-{self.max_size})")
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
-    async def init_tables(self):
-        """Initialize database tables"""
-        async with self.pool.acquire() as conn:
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS warnings (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    moderator_id BIGINT NOT NULL,
-                    reason TEXT,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    INDEX (guild_id, user_id)
-                )
-            """)
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
 
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS analytics (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    guild_id BIGINT NOT NULL,
-                    channel_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    message_count INT DEFAULT 0,
-                    event_type TEXT,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    INDEX (guild_id, channel_id)
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS welcome_settings (
-                    guild_id BIGINT PRIMARY KEY,
-                    channel_id BIGINT NOT NULL,
-                    welcome_message TEXT,
-                    dm_message TEXT,
-                    use_embed BOOLEAN DEFAULT true
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS custom_commands (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    guild_id BIGINT NOT NULL,
-                    command_name TEXT NOT NULL,
-                    response TEXT NOT NULL,
-                    description TEXT,
-                    created_by BIGINT NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE (guild_id, command_name)
-                )
-            """)
+    @asynccontextmanager
+    async def acquire(self, name: str):
+        """Pool connection that records how long it took to get and how long it was held"""
+        start = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            acquired = time.perf_counter()
+            self.pool_wait.record(name, acquired - start)
+            try:
+                yield conn
+            finally:
+                self.query_time.record(name, time.perf_counter() - acquired)
 
-            # Reaction Roles table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS reaction_roles (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    guild_id BIGINT NOT NULL,
-                    message_id BIGINT NOT NULL,
-                    channel_id BIGINT NOT NULL,
-                    role_id BIGINT NOT NULL,
-                    emoji TEXT NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE (message_id, emoji)
-                )
-            """)
+    @asynccontextmanager
+    async def transaction(self, name: str):
+        """One connection and one transaction for a multi-statement method"""
+        async with self.acquire(name) as conn:
+            async with conn.transaction():
+                yield conn
 
-            # Analytics Data table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS analytics_data (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    guild_id BIGINT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    target_id BIGINT NOT NULL,
-                    count INTEGER DEFAULT 0,
-                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    additional_data JSONB,
-                    INDEX (guild_id, data_type, target_id)
-                )
-            """)
+    def stats(self) -> Dict[str, Any]:
+        names = sorted(self.query_time.keys())
+        return {
+            'pool_size': self.pool.get_size() if self.pool else 0,
+            'pool_idle': self.pool.get_idle_size() if self.pool else 0,
+            'queries': {
+                name: {
+                    'query': self.query_time.summary(name),
+                    'pool_wait': self.pool_wait.summary(name)
+                }
+                for name in names
+            }
+        }
 
     # Warning Methods
     async def add_warning(self, guild_id: int, user_id: int, moderator_id: int, reason: str) -> int:
-        async with self.pool.acquire() as conn:
+        async with self.transaction('add_warning') as conn:
             await conn.execute("""
                 INSERT INTO warnings (guild_id, user_id, moderator_id, reason)
                 VALUES ($1, $2, $3, $4)
@@ -120,7 +122,7 @@ class DatabaseManager:
             """, guild_id, user_id)
 
     async def get_warnings(self, guild_id: int, user_id: int) -> List[Dict[str, Any]]:
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_warnings') as conn:
             return await conn.fetch("""
                 SELECT * FROM warnings
                 WHERE guild_id = $1 AND user_id = $2
@@ -129,28 +131,78 @@ class DatabaseManager:
 
     # Analytics Methods
     async def log_activity(self, guild_id: int, channel_id: int, user_id: int, event_type: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('log_activity') as conn:
             await conn.execute("""
                 INSERT INTO analytics (guild_id, channel_id, user_id, event_type)
                 VALUES ($1, $2, $3, $4)
             """, guild_id, channel_id, user_id, event_type)
 
     async def get_analytics(self, guild_id: int, timeframe: str) -> Dict[str, Any]:
-        async with self.pool.acquire() as conn:
+        """Message totals for a timeframe, read from the hourly rollups"""
+        async with self.acquire('get_analytics') as conn:
             return await conn.fetchrow("""
                 SELECT 
-                    COUNT(*) as message_count,
+                    COALESCE(SUM(message_count), 0)::INT8 as message_count,
                     COUNT(DISTINCT user_id) as unique_users,
                     COUNT(DISTINCT channel_id) as active_channels
-                FROM analytics
+                FROM analytics_user_hourly
                 WHERE guild_id = $1
-                AND timestamp > NOW() - $2::interval
+                AND bucket > NOW() - $2::interval
             """, guild_id, timeframe)
 
+    async def get_hourly_activity(self, guild_id: int, timeframe: str,
+                                channel_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-hour message counts for a guild or a single channel"""
+        async with self.acquire('get_hourly_activity') as conn:
+            return await conn.fetch("""
+                SELECT bucket, SUM(message_count)::INT8 as message_count
+                FROM analytics_channel_hourly
+                WHERE guild_id = $1
+                AND bucket > NOW() - $2::interval
+                AND ($3::INT8 IS NULL OR channel_id = $3)
+                GROUP BY bucket
+                ORDER BY bucket
+            """, guild_id, timeframe, channel_id)
+
+    async def get_activity_arrays(self, guild_id: int, timeframe: str,
+                                  channel_id: Optional[int] = None) -> tuple:
+        """Hourly buckets as two parallel arrays (epoch seconds, message counts),
+        so callers get one row back instead of a Record per hour"""
+        async with self.acquire('get_activity_arrays') as conn:
+            row = await conn.fetchrow("""
+                SELECT 
+                    array_agg(epoch ORDER BY epoch) as epochs,
+                    array_agg(message_count ORDER BY epoch) as counts
+                FROM (
+                    SELECT 
+                        extract(epoch FROM bucket)::INT8 as epoch,
+                        SUM(message_count)::INT8 as message_count
+                    FROM analytics_channel_hourly
+                    WHERE guild_id = $1
+                    AND bucket > NOW() - $2::interval
+                    AND ($3::INT8 IS NULL OR channel_id = $3)
+                    GROUP BY bucket
+                ) hourly
+            """, guild_id, timeframe, channel_id)
+            return row['epochs'] or [], row['counts'] or []
+
+    async def get_top_channels(self, guild_id: int, timeframe: str, 
+                             limit: int = 5) -> List[Dict[str, Any]]:
+        async with self.acquire('get_top_channels') as conn:
+            return await conn.fetch("""
+                SELECT channel_id, SUM(message_count)::INT8 as message_count
+                FROM analytics_channel_hourly
+                WHERE guild_id = $1
+                AND bucket > NOW() - $2::interval
+                GROUP BY channel_id
+                ORDER BY message_count DESC
+                LIMIT $3
+            """, guild_id, timeframe, limit)
+
     # Welcome Settings Methods
     async def set_welcome(self, guild_id: int, channel_id: int, message: str, 
                          dm_message: Optional[str] = None, use_embed: bool = True):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('set_welcome') as conn:
             await conn.execute("""
                 INSERT INTO welcome_settings (guild_id, channel_id, welcome_message, dm_message, use_embed)
                 VALUES ($1, $2, $3, $4, $5)
@@ -163,7 +215,7 @@ class DatabaseManager:
             """, guild_id, channel_id, message, dm_message, use_embed)
 
     async def get_welcome_settings(self, guild_id: int) -> Optional[Dict[str, Any]]:
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_welcome_settings') as conn:
             return await conn.fetchrow("""
                 SELECT * FROM welcome_settings WHERE guild_id = $1
             """, guild_id)
@@ -171,7 +223,7 @@ class DatabaseManager:
     # Custom Commands Methods
     async def create_command(self, guild_id: int, command_name: str, 
                            response: str, description: str, created_by: int):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('create_command') as conn:
             await conn.execute("""
                 INSERT INTO custom_commands 
                 (guild_id, command_name, response, description, created_by)
@@ -179,7 +231,7 @@ class DatabaseManager:
             """, guild_id, command_name, response, description, created_by)
 
     async def get_commands(self, guild_id: int) -> List[Dict[str, Any]]:
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_commands') as conn:
             return await conn.fetch("""
                 SELECT * FROM custom_commands WHERE guild_id = $1
             """, guild_id)
@@ -187,7 +239,7 @@ class DatabaseManager:
     # Add methods for reaction roles
     async def add_reaction_role(self, guild_id: int, message_id: int, 
                               channel_id: int, role_id: int, emoji: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('add_reaction_role') as conn:
             await conn.execute("""
                 INSERT INTO reaction_roles 
                 (guild_id, message_id, channel_id, role_id, emoji)
@@ -195,25 +247,149 @@ class DatabaseManager:
             """, guild_id, message_id, channel_id, role_id, emoji)
 
     async def get_reaction_roles(self, guild_id: int) -> List[Dict[str, Any]]:
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_reaction_roles') as conn:
             return await conn.fetch("""
                 SELECT * FROM reaction_roles WHERE guild_id = $1
             """, guild_id)
 
+    async def get_all_reaction_roles(self) -> List[Dict[str, Any]]:
+        async with self.acquire('get_all_reaction_roles') as conn:
+            return await conn.fetch("""
+                SELECT message_id, emoji, role_id FROM reaction_roles
+            """)
+
     # Add methods for analytics
     async def log_analytics(self, guild_id: int, data_type: str, 
                           target_id: int, count: int = 1, 
                           additional_data: dict = None):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('log_analytics') as conn:
             await conn.execute("""
                 INSERT INTO analytics_data 
                 (guild_id, data_type, target_id, count, additional_data)
                 VALUES ($1, $2, $3, $4, $5)
             """, guild_id, data_type, target_id, count, additional_data)
 
+    async def log_message_events(self, events: List[tuple]):
+        """Bulk insert (guild_id, channel_id, user_id, created_at) message events
+        and fold them into the hourly rollups in the same transaction"""
+        raw_rows = []
+        user_buckets: Dict[tuple, int] = {}
+        channel_buckets: Dict[tuple, int] = {}
+        for guild_id, channel_id, user_id, created_at in events:
+            raw_rows.append((
+                guild_id, 'message', channel_id, 1,
+                json.dumps({'user_id': user_id, 'hour': created_at.hour}),
+                created_at
+            ))
+            bucket = created_at.replace(minute=0, second=0, microsecond=0)
+            user_key = (guild_id, bucket, channel_id, user_id)
+            user_buckets[user_key] = user_buckets.get(user_key, 0) + 1
+            channel_key = (guild_id, bucket, channel_id)
+            channel_buckets[channel_key] = channel_buckets.get(channel_key, 0) + 1
+
+        async with self.transaction('log_message_events') as conn:
+            await conn.executemany("""
+                INSERT INTO analytics_data 
+                (guild_id, data_type, target_id, count, additional_data, timestamp)
+                VALUES ($1, $2, $3, $4, $5::JSONB, $6)
+            """, raw_rows)
+            await conn.executemany("""
+                INSERT INTO analytics_user_hourly 
+                (guild_id, bucket, channel_id, user_id, message_count)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (guild_id, bucket, channel_id, user_id)
+                DO UPDATE SET message_count = analytics_user_hourly.message_count + EXCLUDED.message_count
+            """, [(*key, count) for key, count in user_buckets.items()])
+            await conn.executemany("""
+                INSERT INTO analytics_channel_hourly 
+                (guild_id, bucket, channel_id, message_count)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (guild_id, bucket, channel_id)
+                DO UPDATE SET message_count = analytics_channel_hourly.message_count + EXCLUDED.message_count
+            """, [(*key, count) for key, count in channel_buckets.items()])
+
+    async def log_member_events(self, events: List[tuple]):
+        """Bulk insert (guild_id, user_id, event_type, joined_at, occurred_at, member_count)
+        join/leave events and fold them into member_growth_daily in the same transaction"""
+        days: Dict[tuple, list] = {}
+        cohorts: Dict[tuple, int] = {}
+        for guild_id, user_id, event_type, joined_at, occurred_at, member_count in events:
+            # joins, leaves, member count at the latest event of the day
+            day = days.setdefault((guild_id, occurred_at.date()), [0, 0, None, None])
+            day[0 if event_type == 'join' else 1] += 1
+            if day[3] is None or occurred_at >= day[3]:
+                day[2], day[3] = member_count, occurred_at
+            if event_type == 'leave' and joined_at:
+                cohort_key = (guild_id, joined_at.date())
+                cohorts[cohort_key] = cohorts.get(cohort_key, 0) + 1
+
+        async with self.transaction('log_member_events') as conn:
+            await conn.executemany("""
+                INSERT INTO member_events 
+                (guild_id, user_id, event_type, joined_at, occurred_at)
+                VALUES ($1, $2, $3, $4, $5)
+            """, [event[:5] for event in events])
+            await conn.executemany("""
+                INSERT INTO member_growth_daily (guild_id, day, joins, leaves, member_count)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (guild_id, day)
+                DO UPDATE SET 
+                    joins = member_growth_daily.joins + EXCLUDED.joins,
+                    leaves = member_growth_daily.leaves + EXCLUDED.leaves,
+                    member_count = COALESCE(EXCLUDED.member_count, member_growth_daily.member_count)
+            """, [(*key, joins, leaves, count) for key, (joins, leaves, count, _) in days.items()])
+            await conn.executemany("""
+                INSERT INTO member_growth_daily (guild_id, day, cohort_departed)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (guild_id, day)
+                DO UPDATE SET cohort_departed = member_growth_daily.cohort_departed + EXCLUDED.cohort_departed
+            """, [(*key, departed) for key, departed in cohorts.items()])
+
+    async def get_unbackfilled_guilds(self, guild_ids: List[int]) -> Dict[int, Optional[datetime]]:
+        """Guilds still needing a backfill, mapped to their earliest recorded member event (if any)"""
+        async with self.acquire('get_unbackfilled_guilds') as conn:
+            rows = await conn.fetch("""
+                SELECT 
+                    g.guild_id,
+                    (SELECT min(occurred_at) FROM member_events e WHERE e.guild_id = g.guild_id) as recording_since
+                FROM unnest($1::INT8[]) AS g(guild_id)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM member_growth_backfills b WHERE b.guild_id = g.guild_id
+                )
+            """, guild_ids)
+        return {row['guild_id']: row['recording_since'] for row in rows}
+
+    async def backfill_member_growth(self, guild_id: int, rows: List[tuple]):
+        """Add (day, joins, member_count) rows reconstructed from members' join dates
+        and mark the guild done, atomically so a retried backfill never double counts"""
+        async with self.transaction('backfill_member_growth') as conn:
+            await conn.executemany("""
+                INSERT INTO member_growth_daily (guild_id, day, joins, member_count)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (guild_id, day)
+                DO UPDATE SET 
+                    joins = member_growth_daily.joins + EXCLUDED.joins,
+                    member_count = COALESCE(member_growth_daily.member_count, EXCLUDED.member_count)
+            """, [(guild_id, *row) for row in rows])
+            await conn.execute("""
+                INSERT INTO member_growth_backfills (guild_id) VALUES ($1)
+                ON CONFLICT (guild_id) DO NOTHING
+            """, guild_id)
+
+    async def get_member_growth(self, guild_id: int, timeframe: str) -> List[Dict[str, Any]]:
+        """Daily growth rows, one per day with activity, oldest first"""
+        async with self.acquire('get_member_growth') as conn:
+            return await conn.fetch("""
+                SELECT day, joins, leaves, member_count, cohort_departed
+                FROM member_growth_daily
+                WHERE guild_id = $1
+                AND day > (NOW() - $2::interval)::DATE
+                ORDER BY day
+            """, guild_id, timeframe)
+
     async def get_analytics_data(self, guild_id: int, data_type: str, 
                                timeframe: str) -> List[Dict[str, Any]]:
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_analytics_data') as conn:
             return await conn.fetch("""
                 SELECT * FROM analytics_data 
                 WHERE guild_id = $1 
@@ -223,7 +399,7 @@ class DatabaseManager:
             """, guild_id, data_type, timeframe)
 
     async def add_announcement_template(self, guild_id: int, name: str, title: str, content: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('add_announcement_template') as conn:
             await conn.execute("""
                 INSERT INTO announcement_templates (guild_id, name, title, content)
                 VALUES ($1, $2, $3, $4)
@@ -232,7 +408,7 @@ class DatabaseManager:
             """, guild_id, name, title, content)
 
     async def get_announcement_template(self, guild_id: int, name: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_announcement_template') as conn:
             return await conn.fetchrow("""
                 SELECT * FROM announcement_templates 
                 WHERE guild_id = $1 AND name = $2
@@ -240,38 +416,154 @@ class DatabaseManager:
 
     async def schedule_announcement(self, guild_id: int, channel_id: int, 
                                  title: str, content: str, schedule_time: datetime, 
-                                 repeat: Optional[str] = None):
-        async with self.pool.acquire() as conn:
-            await conn.execute("""
+                                 repeat: Optional[str] = None) -> int:
+        async with self.acquire('schedule_announcement') as conn:
+            return await conn.fetchval("""
                 INSERT INTO scheduled_announcements 
-                (guild_id, channel_id, title, content, schedule_time, repeat_type)
-                VALUES ($1, $2, $3, $4, $5, $6)
+                (guild_id, channel_id, title, content, schedule_time, start_time, repeat_type)
+                VALUES ($1, $2, $3, $4, $5, $5, $6)
+                RETURNING id
             """, guild_id, channel_id, title, content, schedule_time, repeat)
 
-    async def get_automod_settings(self, guild_id: int):
-        async with self.pool.acquire() as conn:
-            settings = await conn.fetchrow("""
-                INSERT INTO automod_settings (guild_id)
-                VALUES ($1)
-                ON CONFLICT (guild_id) DO UPDATE SET guild_id = EXCLUDED.guild_id
-                RETURNING *;
+    async def get_scheduled_announcements(self) -> List[Dict[str, Any]]:
+        async with self.acquire('get_scheduled_announcements') as conn:
+            return await conn.fetch("""
+                SELECT * FROM scheduled_announcements
+            """)
+
+    async def update_announcement_time(self, announcement_id: int, schedule_time: datetime):
+        async with self.acquire('update_announcement_time') as conn:
+            await conn.execute("""
+                UPDATE scheduled_announcements SET schedule_time = $2 WHERE id = $1
+            """, announcement_id, schedule_time)
+
+    async def delete_scheduled_announcement(self, announcement_id: int):
+        async with self.acquire('delete_scheduled_announcement') as conn:
+            await conn.execute("""
+                DELETE FROM scheduled_announcements WHERE id = $1
+            """, announcement_id)
+
+    # Levels methods
+    async def add_xp_batch(self, guild_ids: List[int], user_ids: List[int], xp: List[int],
+                           messages: List[int], last_message_at: List[datetime]) -> List[Dict[str, Any]]:
+        """Add XP deltas for many users in one statement; returns their new totals and stored level"""
+        async with self.acquire('add_xp_batch') as conn:
+            return await conn.fetch("""
+                INSERT INTO levels (guild_id, user_id, xp, message_count, last_message_at)
+                SELECT * FROM unnest($1::INT8[], $2::INT8[], $3::INT8[], $4::INT8[], $5::TIMESTAMPTZ[])
+                ON CONFLICT (guild_id, user_id)
+                DO UPDATE SET 
+                    xp = levels.xp + EXCLUDED.xp,
+                    message_count = levels.message_count + EXCLUDED.message_count,
+                    last_message_at = EXCLUDED.last_message_at
+                RETURNING guild_id, user_id, xp, level
+            """, guild_ids, user_ids, xp, messages, last_message_at)
+
+    async def set_levels(self, rows: List[tuple]):
+        """Store (guild_id, user_id, level) after level-ups"""
+        async with self.acquire('set_levels') as conn:
+            await conn.executemany("""
+                UPDATE levels SET level = $3 WHERE guild_id = $1 AND user_id = $2
+            """, rows)
+
+    async def get_guild_xp(self, guild_id: int) -> tuple:
+        """Every member's XP as two parallel arrays (user ids, xp) in rank order, so
+        building a rank index only has to confirm the order instead of sorting"""
+        async with self.acquire('get_guild_xp') as conn:
+            row = await conn.fetchrow("""
+                SELECT 
+                    array_agg(user_id ORDER BY xp DESC, user_id) as user_ids,
+                    array_agg(xp ORDER BY xp DESC, user_id) as xp
+                FROM levels
+                WHERE guild_id = $1
             """, guild_id)
-            return dict(settings)
+            return row['user_ids'] or [], row['xp'] or []
 
-    async def update_automod_settings(self, guild_id: int, settings: dict):
-        async with self.pool.acquire() as conn:
-            query = """
-                UPDATE automod_settings
-                SET {} 
+    # Punishment expiry methods
+    async def add_punishment_expiry(self, guild_id: int, user_id: int, action: str,
+                                  reason: Optional[str], moderator_id: int,
+                                  expires_at: datetime) -> tuple:
+        """Record an expiry, replacing any pending one for the same punishment.
+        Returns (new_id, replaced_ids)."""
+        async with self.transaction('add_punishment_expiry') as conn:
+            replaced = await conn.fetch("""
+                DELETE FROM punishment_expiries
+                WHERE guild_id = $1 AND user_id = $2 AND action = $3
+                RETURNING id
+            """, guild_id, user_id, action)
+            expiry_id = await conn.fetchval("""
+                INSERT INTO punishment_expiries 
+                (guild_id, user_id, action, reason, moderator_id, expires_at)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING id
+            """, guild_id, user_id, action, reason, moderator_id, expires_at)
+            return expiry_id, [row['id'] for row in replaced]
+
+    async def get_pending_punishments(self) -> List[Dict[str, Any]]:
+        """Only ids and due times, so startup stays cheap with many pending expiries"""
+        async with self.acquire('get_pending_punishments') as conn:
+            return await conn.fetch("""
+                SELECT id, expires_at FROM punishment_expiries
+            """)
+
+    async def get_punishment_expiry(self, expiry_id: int) -> Optional[Dict[str, Any]]:
+        async with self.acquire('get_punishment_expiry') as conn:
+            return await conn.fetchrow("""
+                SELECT * FROM punishment_expiries WHERE id = $1
+            """, expiry_id)
+
+    async def get_guild_punishments(self, guild_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        async with self.acquire('get_guild_punishments') as conn:
+            return await conn.fetch("""
+                SELECT * FROM punishment_expiries
                 WHERE guild_id = $1
-            """.format(
-                ', '.join(f"{k} = ${i+2}" for i, k in enumerate(settings.keys()))
+                ORDER BY expires_at
+                LIMIT $2
+            """, guild_id, limit)
+
+    async def retry_punishment_expiry(self, expiry_id: int, attempts: int, expires_at: datetime):
+        async with self.acquire('retry_punishment_expiry') as conn:
+            await conn.execute("""
+                UPDATE punishment_expiries SET attempts = $2, expires_at = $3 WHERE id = $1
+            """, expiry_id, attempts, expires_at)
+
+    async def delete_punishment_expiry(self, expiry_id: int, 
+                                     guild_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        async with self.acquire('delete_punishment_expiry') as conn:
+            return await conn.fetchrow("""
+                DELETE FROM punishment_expiries
+                WHERE id = $1 AND ($2::INT8 IS NULL OR guild_id = $2)
+                RETURNING *
+            """, expiry_id, guild_id)
+
+    async def get_automod_settings(self, guild_id: int) -> Dict[str, Any]:
+        """Plain read; guilds without a row get the column defaults and no row is created"""
+        async with self.acquire('get_automod_settings') as conn:
+            row = await conn.fetchrow("""
+                SELECT * FROM automod_settings WHERE guild_id = $1
+            """, guild_id)
+        if row is None:
+            # Copied so a caller editing exempt_roles can't change every guild's defaults
+            return {'guild_id': guild_id, **copy.deepcopy(AUTOMOD_DEFAULTS)}
+        return dict(row)
+
+    async def update_automod_settings(self, guild_id: int, settings: dict):
+        unknown = set(settings) - AUTOMOD_DEFAULTS.keys()
+        if unknown:
+            raise ValueError(f"Unknown automod settings: {', '.join(sorted(unknown))}")
+        if not settings:
+            return
+
+        columns = tuple(sorted(settings))
+        async with self.acquire('update_automod_settings') as conn:
+            await conn.execute(
+                _automod_upsert_sql(columns),
+                guild_id, *(settings[column] for column in columns)
             )
-            await conn.execute(query, guild_id, *settings.values())
 
     async def log_violation(self, guild_id: int, user_id: int, 
                           action_type: str, reason: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('log_violation') as conn:
             await conn.execute("""
                 INSERT INTO automod_logs 
                 (guild_id, user_id, action_type, reason)
@@ -279,15 +571,101 @@ class DatabaseManager:
             """, guild_id, user_id, action_type, reason)
 
     async def get_whitelist(self, guild_id: int, type: str):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_whitelist') as conn:
             items = await conn.fetch("""
                 SELECT item FROM automod_whitelist
                 WHERE guild_id = $1 AND type = $2
             """, guild_id, type)
             return [item['item'] for item in items]
 
+    async def get_filter_patterns(self, guild_id: int) -> List[Dict[str, Any]]:
+        async with self.acquire('get_filter_patterns') as conn:
+            return await conn.fetch("""
+                SELECT * FROM filter_patterns WHERE guild_id = $1
+            """, guild_id)
+
+    async def add_filter_pattern(self, guild_id: int, pattern: str, 
+                               regex_pattern: Optional[str], severity: int, 
+                               category: str, description: Optional[str], 
+                               is_regex: bool, created_by: int, 
+                               match_mode: str = 'word'):
+        async with self.acquire('add_filter_pattern') as conn:
+            await conn.execute("""
+                INSERT INTO filter_patterns 
+                (guild_id, pattern, regex_pattern, severity, category, 
+                 description, is_regex, created_by, match_mode)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            """, guild_id, pattern, regex_pattern, severity, category,
+                description, is_regex, created_by, match_mode)
+
+    async def import_filter_patterns(self, guild_id: int, batches: List[List[tuple]],
+                                     progress=None) -> tuple:
+        """Insert already validated batches of (pattern, regex_pattern, severity, category,
+        description, is_regex, created_by, match_mode) rows in one transaction, skipping
+        duplicates. Returns (added, duplicates)."""
+        added = 0
+        duplicates = 0
+        async with self.transaction('import_filter_patterns') as conn:
+            existing = {
+                (row['is_regex'], row['regex_pattern'] if row['is_regex'] else row['pattern'].lower())
+                for row in await conn.fetch("""
+                    SELECT pattern, regex_pattern, is_regex FROM filter_patterns
+                    WHERE guild_id = $1
+                """, guild_id)
+            }
+
+            for batch in batches:
+                rows = []
+                for row in batch:
+                    pattern, regex_pattern, _, _, _, is_regex = row[:6]
+                    key = (is_regex, regex_pattern if is_regex else pattern.lower())
+                    if key in existing:
+                        duplicates += 1
+                        continue
+                    existing.add(key)
+                    rows.append((guild_id, *row))
+
+                if rows:
+                    await conn.executemany("""
+                        INSERT INTO filter_patterns 
+                        (guild_id, pattern, regex_pattern, severity, category, 
+                         description, is_regex, created_by, match_mode)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                    """, rows)
+                    added += len(rows)
+                if progress:
+                    await progress(added)
+        return added, duplicates
+
+    async def get_filter_pattern_version(self, guild_id: int) -> int:
+        async with self.acquire('get_filter_pattern_version') as conn:
+            version = await conn.fetchval("""
+                SELECT version FROM filter_pattern_versions WHERE guild_id = $1
+            """, guild_id)
+            return version or 0
+
+    async def bump_filter_pattern_version(self, guild_id: int) -> int:
+        async with self.acquire('bump_filter_pattern_version') as conn:
+            return await conn.fetchval("""
+                INSERT INTO filter_pattern_versions (guild_id, version, updated_at)
+                VALUES ($1, 1, NOW())
+                ON CONFLICT (guild_id) 
+                DO UPDATE SET 
+                    version = filter_pattern_versions.version + 1,
+                    updated_at = NOW()
+                RETURNING version
+            """, guild_id)
+
+    async def get_filter_pattern_versions_since(self, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Versions changed after `since`, re-reading a short overlap so late commits aren't missed"""
+        async with self.acquire('get_filter_pattern_versions_since') as conn:
+            return await conn.fetch("""
+                SELECT guild_id, version, updated_at FROM filter_pattern_versions
+                WHERE updated_at > COALESCE($1, NOW()) - INTERVAL '10 seconds'
+            """, since)
+
     async def update_filter_settings(self, guild_id: int, settings: dict):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('update_filter_settings') as conn:
             await conn.execute("""
                 INSERT INTO filter_settings (guild_id, filter_action, notify_channel)
                 VALUES ($1, $2, $3)
@@ -298,16 +676,35 @@ class DatabaseManager:
             """, guild_id, settings['filter_action'], settings['notify_channel'])
 
     async def get_filter_settings(self, guild_id: int):
-        async with self.pool.acquire() as conn:
+        async with self.acquire('get_filter_settings') as conn:
             return await conn.fetchrow("""
                 SELECT * FROM filter_settings WHERE guild_id = $1
             """, guild_id)
 
     async def log_filter_violation(self, guild_id: int, user_id: int, 
-                                 channel_id: int, severity: int):
-        async with self.pool.acquire() as conn:
+                                 channel_id: int, severity: int,
+                                 message_content: Optional[str] = None,
+                                 matched_pattern: Optional[str] = None,
+                                 category: Optional[str] = None,
+                                 action_taken: Optional[str] = None):
+        async with self.acquire('log_filter_violation') as conn:
             await conn.execute("""
                 INSERT INTO filter_violations 
-                (guild_id, user_id, channel_id, severity)
-                VALUES ($1, $2, $3, $4)
-            """, guild_id, user_id, channel_id, severity)
\ No newline at end of file
+                (guild_id, user_id, channel_id, severity, message_content,
+                 matched_pattern, category, action_taken)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            """, guild_id, user_id, channel_id, severity, message_content,
+                matched_pattern, category, action_taken)
+
+    async def get_filter_violations(self, guild_id: int, user_id: Optional[int] = None,
+                                  category: Optional[str] = None, 
+                                  limit: int = 50) -> List[Dict[str, Any]]:
+        async with self.acquire('get_filter_violations') as conn:
+            return await conn.fetch("""
+                SELECT * FROM filter_violations
+                WHERE guild_id = $1
+                AND ($2::INT8 IS NULL OR user_id = $2)
+                AND ($3::TEXT IS NULL OR category = $3)
+                ORDER BY timestamp DESC
+                LIMIT $4
+            """, guild_id, user_id, category, limit)
\ No newline at end of file
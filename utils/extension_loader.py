@@ -0,0 +1,94 @@
+import ast
+import asyncio
+import importlib.util
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+from utils.startup_report import StartupReport
+
+logger = logging.getLogger('discord')
+
+def dependency_waves(dependencies: Dict[str, Set[str]]) -> List[List[str]]:
+    """Group extensions so each wave only depends on earlier waves; cycles end up in none"""
+    remaining = dict(dependencies)
+    done: Set[str] = set()
+    waves = []
+    while remaining:
+        wave = sorted(name for name, deps in remaining.items() if deps <= done)
+        if not wave:
+            break
+        waves.append(wave)
+        done.update(wave)
+        for name in wave:
+            del remaining[name]
+    return waves
+
+def read_dependencies(name: str) -> Tuple[str, ...]:
+    """An extension's DEPENDENCIES, read from its source so the module runs only once, in load_extension"""
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    with open(spec.origin, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=spec.origin)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == 'DEPENDENCIES' for target in node.targets
+        ):
+            return tuple(ast.literal_eval(node.value))
+    return ()
+
+async def load_extensions(bot, names: Iterable[str], report: StartupReport) -> Dict[str, str]:
+    """Load extensions concurrently in dependency order; returns {name: error} for failures
+
+    A cog module can declare DEPENDENCIES: names of bot attributes it needs
+    (such as 'db' or 'config') and/or other extensions that must load first.
+    """
+    failed: Dict[str, str] = {}
+    dependencies: Dict[str, Set[str]] = {}
+    names = sorted(names)
+
+    def fail(name: str, error: str):
+        failed[name] = error
+        report.timing(name).error = error
+
+    for name in names:
+        report.add(name)
+        try:
+            declared = read_dependencies(name)
+        except (OSError, SyntaxError, ValueError, ImportError) as e:
+            fail(name, f"{type(e).__name__}: {e}")
+            continue
+
+        extension_deps = set()
+        for dependency in declared:
+            if dependency in names:
+                extension_deps.add(dependency)
+            elif getattr(bot, dependency, None) is None:
+                fail(name, f"service '{dependency}' is not available")
+                break
+        else:
+            dependencies[name] = extension_deps
+
+    waves = dependency_waves(dependencies)
+    for wave in waves:
+        ready = []
+        for name in wave:
+            missing = [dep for dep in dependencies[name] if dep in failed]
+            if missing:
+                fail(name, f"dependency {', '.join(missing)} failed to load")
+            else:
+                ready.append(name)
+
+        timings = await asyncio.gather(*(report.setup_extension(bot, name) for name in ready))
+        for timing in timings:
+            if timing.error:
+                failed[timing.name] = timing.error
+
+    scheduled = {name for wave in waves for name in wave}
+    for name in dependencies.keys() - scheduled:
+        fail(name, "circular dependency")
+
+    for name, error in failed.items():
+        logger.error(f"Failed to load {name}: {error}")
+    logger.info(f"Loaded {len(names) - len(failed)}/{len(names)} extensions")
+    return failed
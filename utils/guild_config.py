@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+@dataclass(frozen=True)
+class WelcomeConfig:
+    channel_id: int
+    welcome_message: Optional[str] = None
+    dm_message: Optional[str] = None
+    use_embed: bool = True
+
+@dataclass(frozen=True)
+class FilterConfig:
+    filter_action: str = 'warn'
+    notify_channel: Optional[int] = None
+
+@dataclass(frozen=True)
+class AutomodConfig:
+    spam_threshold: int = 5
+    spam_window_seconds: int = 5
+    max_mentions: int = 5
+    link_filter: bool = False
+    caps_threshold: int = 70
+    warn_threshold: int = 3
+    action_type: str = 'warn'
+    exempt_roles: Tuple[int, ...] = ()
+    exempt_channels: Tuple[int, ...] = ()
+
+def from_row(cls, row) -> Any:
+    """Build a config dataclass from a record, ignoring columns it doesn't declare"""
+    values = {}
+    for field in fields(cls):
+        if field.name in row.keys() and row[field.name] is not None:
+            value = row[field.name]
+            values[field.name] = tuple(value) if isinstance(value, list) else value
+    return cls(**values)
+
+class GuildConfigCache:
+    """Read-through cache of per-guild settings with TTLs, negative entries and write-through setters"""
+
+    SECTIONS = ('welcome', 'filter', 'automod')
+
+    def __init__(self, db, ttl: float = 300.0, negative_ttl: float = 60.0, max_entries: int = 20000):
+        self.db = db
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        # (section, guild_id) -> (value or None, expires_at)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        # Bumped on every write so a load that started earlier can't store a stale row
+        self._generations: Dict[Tuple[str, int], int] = {}
+
+        # Metrics
+        self.hits = {section: 0 for section in self.SECTIONS}
+        self.negative_hits = {section: 0 for section in self.SECTIONS}
+        self.misses = {section: 0 for section in self.SECTIONS}
+        self.coalesced = {section: 0 for section in self.SECTIONS}
+        self.evictions = 0
+
+    async def _get(self, section: str, guild_id: int, load: Callable[[], Awaitable[Any]]) -> Any:
+        key = (section, guild_id)
+        cached = self._entries.get(key)
+        if cached and cached[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            if cached[0] is None:
+                self.negative_hits[section] += 1
+            else:
+                self.hits[section] += 1
+            return cached[0]
+
+        future = self._inflight.get(key)
+        if future:
+            self.coalesced[section] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller doing the load was cancelled, not us; load it ourselves
+                return await self._get(section, guild_id, load)
+
+        self.misses[section] += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        generation = self._generations.get(key, 0)
+        try:
+            value = await load()
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; retrieve it so asyncio doesn't warn
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if self._generations.get(key, 0) == generation:
+                self._store(key, value)
+            return value
+        finally:
+            # Cancellation skips both branches above; waiters must not hang on the future
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
+
+    def _store(self, key: Tuple[str, int], value: Any):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, guild_id: int, section: Optional[str] = None):
+        for name in (section,) if section else self.SECTIONS:
+            key = (name, guild_id)
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _write(self, section: str, guild_id: int, value: Any):
+        self.invalidate(guild_id, section)
+        self._store((section, guild_id), value)
+
+    # Welcome
+    async def welcome_settings(self, guild_id: int) -> Optional[WelcomeConfig]:
+        async def load():
+            row = await self.db.get_welcome_settings(guild_id)
+            return from_row(WelcomeConfig, row) if row else None
+        return await self._get('welcome', guild_id, load)
+
+    async def set_welcome(self, guild_id: int, channel_id: int, message: str,
+                          dm_message: Optional[str] = None, use_embed: bool = True):
+        await self.db.set_welcome(guild_id, channel_id, message, dm_message, use_embed)
+        self._write('welcome', guild_id, WelcomeConfig(channel_id, message, dm_message, use_embed))
+
+    # Word filter
+    async def filter_settings(self, guild_id: int) -> FilterConfig:
+        async def load():
+            row = await self.db.get_filter_settings(guild_id)
+            return from_row(FilterConfig, row) if row else None
+        return await self._get('filter', guild_id, load) or FilterConfig()
+
+    async def update_filter_settings(self, guild_id: int, settings: dict):
+        await self.db.update_filter_settings(guild_id, settings)
+        self._write('filter', guild_id, FilterConfig(settings['filter_action'], settings['notify_channel']))
+
+    # Automod
+    async def automod_settings(self, guild_id: int) -> AutomodConfig:
+        async def load():
+            return from_row(AutomodConfig, await self.db.get_automod_settings(guild_id))
+        return await self._get('automod', guild_id, load)
+
+    async def update_automod_settings(self, guild_id: int, settings: dict):
+        await self.db.update_automod_settings(guild_id, settings)
+        self.invalidate(guild_id, 'automod')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'evictions': self.evictions,
+            **{
+                section: {
+                    'hits': self.hits[section],
+                    'negative_hits': self.negative_hits[section],
+                    'misses': self.misses[section],
+                    'coalesced': self.coalesced[section]
+                }
+                for section in self.SECTIONS
+            }
+        }
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import List, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+HOUR = 3600
+DAY = 86400
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+def _offset(zone: ZoneInfo, epoch: int) -> int:
+    return int(datetime.fromtimestamp(epoch, zone).utcoffset().total_seconds())
+
+def utc_offset_transitions(zone: ZoneInfo, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(epochs, offsets) where each offset applies from its epoch until the next one.
+
+    The zone is sampled once a day and each change is narrowed down to the
+    hour by bisection, so a year costs ~400 tzinfo lookups however many
+    buckets there are.
+    """
+    start -= start % HOUR
+    epochs = [start]
+    offsets = [_offset(zone, start)]
+    day = start
+    while day < end:
+        next_day = min(day + DAY, end)
+        next_offset = _offset(zone, next_day)
+        if next_offset != offsets[-1]:
+            low, high = day, next_day
+            while high - low > HOUR:
+                mid = low + (high - low) // 2 // HOUR * HOUR
+                if mid == low:
+                    mid += HOUR
+                if _offset(zone, mid) == offsets[-1]:
+                    low = mid
+                else:
+                    high = mid
+            epochs.append(high)
+            offsets.append(next_offset)
+        day = next_day
+    return np.asarray(epochs, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+def activity_matrix(epochs: Sequence[int], counts: Sequence[int], tz: str = 'UTC') -> np.ndarray:
+    """7x24 weekday (Monday first) by local hour totals of hourly UTC buckets"""
+    epochs = np.asarray(epochs, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.float64)
+    if epochs.size == 0:
+        return np.zeros((7, 24), dtype=np.int64)
+
+    zone = ZoneInfo(tz)
+    transition_epochs, transition_offsets = utc_offset_transitions(zone, int(epochs.min()), int(epochs.max()))
+    local = epochs + transition_offsets[np.searchsorted(transition_epochs, epochs, side='right') - 1]
+
+    hours = (local // HOUR) % 24
+    # 1970-01-01 was a Thursday, weekday 3 with Monday as 0
+    weekdays = (local // DAY + 3) % 7
+    matrix = np.bincount(weekdays * 24 + hours, weights=counts, minlength=7 * 24)
+    return matrix.reshape(7, 24).round().astype(np.int64)
+
+def peak_cells(matrix: np.ndarray, limit: int = 3) -> List[Tuple[str, int, int]]:
+    """Busiest (weekday, hour, count) cells, largest first"""
+    flat = matrix.ravel()
+    order = np.argsort(flat)[::-1][:limit]
+    return [(WEEKDAYS[i // 24], int(i % 24), int(flat[i])) for i in order if flat[i] > 0]
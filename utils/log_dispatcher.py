@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+import discord
+
+logger = logging.getLogger('discord')
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+class TokenBucket:
+    """Allows `rate` acquisitions per `per` seconds, sleeping when empty"""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+class _ChannelQueue:
+    def __init__(self, channel_id: int, rate: int, per: float):
+        self.channel_id = channel_id
+        self.pending: deque = deque()
+        self.dropped: Counter = Counter()
+        self.bucket = TokenBucket(rate, per)
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+class LogDispatcher:
+    """Per-channel outbound queues that coalesce log embeds into as few messages as possible"""
+
+    def __init__(self, bot, linger: float = 1.0, max_backlog: int = 200,
+                 rate: int = 5, per: float = 5.0, idle_timeout: float = 60.0):
+        self.bot = bot
+        self.linger = linger
+        self.max_backlog = max_backlog
+        self.rate = rate
+        self.per = per
+        self.idle_timeout = idle_timeout
+        self._queues: Dict[int, _ChannelQueue] = {}
+        self._closed = False
+
+        # Metrics
+        self.messages_sent = 0
+        self.embeds_sent = 0
+        self.embeds_dropped = 0
+        self.send_failures = 0
+
+    def enqueue(self, channel_id: int, embed: discord.Embed):
+        """Queue an embed for a log channel; never blocks the caller"""
+        if self._closed:
+            return
+
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = _ChannelQueue(channel_id, self.rate, self.per)
+
+        if len(queue.pending) >= self.max_backlog:
+            # Past the backlog only a count per event type is kept and sent as a summary
+            queue.dropped[embed.title or "Event"] += 1
+            self.embeds_dropped += 1
+        else:
+            queue.pending.append(embed)
+
+        queue.wakeup.set()
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._run(queue))
+
+    def _take_batch(self, queue: _ChannelQueue) -> list:
+        batch = []
+        chars = 0
+        while queue.pending and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            size = len(queue.pending[0])
+            if batch and chars + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append(queue.pending.popleft())
+            chars += size
+
+        if queue.dropped and len(batch) < MAX_EMBEDS_PER_MESSAGE and len(queue.pending) < self.max_backlog // 2:
+            summary = self._summary_embed(queue.dropped)
+            if not batch or chars + len(summary) <= MAX_EMBED_CHARS_PER_MESSAGE:
+                batch.append(summary)
+                queue.dropped.clear()
+        return batch
+
+    @staticmethod
+    def _summary_embed(dropped: Counter) -> discord.Embed:
+        embed = discord.Embed(
+            title="Log Events Skipped",
+            description=f"{sum(dropped.values())} events were skipped because this channel fell behind",
+            color=discord.Color.dark_grey()
+        )
+        for title, count in dropped.most_common(10):
+            embed.add_field(name=title[:256], value=str(count))
+        return embed
+
+    async def _run(self, queue: _ChannelQueue):
+        while True:
+            if not queue.pending and not queue.dropped:
+                if self._closed:
+                    break
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                continue
+
+            # Give a burst a moment to fill the message before spending a token on it
+            if len(queue.pending) < MAX_EMBEDS_PER_MESSAGE and not self._closed:
+                await asyncio.sleep(self.linger)
+
+            await queue.bucket.acquire()
+            batch = self._take_batch(queue)
+            if not batch:
+                continue
+
+            channel = self.bot.get_channel(queue.channel_id)
+            if channel is None:
+                logger.warning(f"Log channel {queue.channel_id} not found, discarding {len(queue.pending) + len(batch)} events")
+                break
+
+            try:
+                await channel.send(embeds=batch)
+            except (discord.Forbidden, discord.NotFound) as e:
+                logger.error(f"Cannot send to log channel {queue.channel_id}: {e}")
+                break
+            except discord.HTTPException as e:
+                self.send_failures += 1
+                logger.warning(f"Failed to send {len(batch)} log embeds to {queue.channel_id}: {e}")
+                continue
+
+            self.messages_sent += 1
+            self.embeds_sent += len(batch)
+
+        if self._queues.get(queue.channel_id) is queue:
+            del self._queues[queue.channel_id]
+
+    async def close(self, timeout: float = 5.0):
+        """Send what is queued, giving up after `timeout` seconds"""
+        self._closed = True
+        tasks = [queue.task for queue in self._queues.values() if queue.task and not queue.task.done()]
+        for queue in self._queues.values():
+            queue.wakeup.set()
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'channels': len(self._queues),
+            'queue_depth': sum(len(queue.pending) for queue in self._queues.values()),
+            'messages_sent': self.messages_sent,
+            'embeds_sent': self.embeds_sent,
+            'embeds_dropped': self.embeds_dropped,
+            'send_failures': self.send_failures
+        }
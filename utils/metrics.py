@@ -0,0 +1,45 @@
+from collections import deque
+from typing import Any, Dict, Optional
+
+class LatencyTracker:
+    """Rolling window of latency samples per key with percentile lookups"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[Any, deque] = {}
+        self._counts: Dict[Any, int] = {}
+
+    def record(self, key: Any, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def percentile(self, key: Any, pct: float) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self, key: Any) -> Dict[str, Any]:
+        samples = self._samples.get(key)
+        if not samples:
+            return {'count': 0}
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {
+            'count': self._counts[key],
+            'p50_ms': round(ordered[int(round(0.50 * last))] * 1000, 2),
+            'p99_ms': round(ordered[int(round(0.99 * last))] * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2)
+        }
+
+    def keys(self):
+        return list(self._samples)
+
+    def discard(self, key: Any):
+        self._samples.pop(key, None)
+        self._counts.pop(key, None)
@@ -0,0 +1,88 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('discord')
+
+@dataclass
+class CacheEntry:
+    value: Any
+    version: int
+    size: int
+    stale: bool = False
+
+class PatternCache:
+    """LRU of compiled per-guild pattern sets, bounded by entry count and estimated bytes"""
+
+    def __init__(self, max_guilds: int = 500, max_bytes: int = 256 * 1024 * 1024,
+                 on_evict: Optional[Callable[[int], None]] = None):
+        self.max_guilds = max_guilds
+        self.max_bytes = max_bytes
+        # Called with the guild id when the budget pushes a guild out
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, guild_id: int) -> Optional[CacheEntry]:
+        """Return a fresh entry and mark it recently used; stale entries count as misses"""
+        entry = self._entries.get(guild_id)
+        if entry is None or entry.stale:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(guild_id)
+        self.hits += 1
+        return entry
+
+    def put(self, guild_id: int, value: Any, version: int, size: int):
+        self.discard(guild_id)
+        self._entries[guild_id] = CacheEntry(value, version, size)
+        self.total_bytes += size
+        self._evict(keep=guild_id)
+
+    def _evict(self, keep: int):
+        while self._entries and (
+            len(self._entries) > self.max_guilds or self.total_bytes > self.max_bytes
+        ):
+            guild_id = next(iter(self._entries))
+            if guild_id == keep:
+                # A single guild larger than the byte budget still gets served
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(guild_id)
+                continue
+            self.discard(guild_id)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(guild_id)
+
+    def discard(self, guild_id: int):
+        entry = self._entries.pop(guild_id, None)
+        if entry:
+            self.total_bytes -= entry.size
+
+    def mark_stale(self, guild_id: int, version: int) -> bool:
+        """Flag an entry for lazy reload if the database has a newer version"""
+        entry = self._entries.get(guild_id)
+        if entry is None or entry.version >= version:
+            return False
+        entry.stale = True
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'guilds': len(self._entries),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
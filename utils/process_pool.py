@@ -0,0 +1,12 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def worker_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers don't inherit the bot's threads and locks
+
+    Forking a process that already runs asyncpg, discord.py and logging threads can
+    copy a lock some other thread holds, deadlocking the worker on its first use.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+# User ids are snowflakes below 2**64, so (-xp, user_id) packs into one int that
+# sorts by XP descending, then user id; far smaller than a tuple per member
+_SHIFT = 64
+
+def _key(user_id: int, xp: int) -> int:
+    return (-xp << _SHIFT) | user_id
+
+def _unpack(key: int) -> Tuple[int, int]:
+    return key & ((1 << _SHIFT) - 1), -(key >> _SHIFT)
+
+class _Fenwick:
+    """Prefix sums of block sizes"""
+
+    def __init__(self, sizes: List[int]):
+        self.n = len(sizes)
+        self.tree = [0] * (self.n + 1)
+        for i, size in enumerate(sizes, 1):
+            self.tree[i] += size
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index: int, delta: int):
+        i = index + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        """Sum of sizes of blocks before `index`"""
+        total = 0
+        i = index
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, offset: int) -> Tuple[int, int]:
+        """(block, position within it) of the element at global `offset`"""
+        index = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.n and self.tree[nxt] <= offset:
+                index = nxt
+                offset -= self.tree[nxt]
+            step >>= 1
+        return index, offset
+
+class RankIndex:
+    """Sorted XP standings for one guild: rank and page lookups in O(log n)"""
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, entries: Iterable[Tuple[int, int]] = ()):
+        self._xp: Dict[int, int] = {}
+        for user_id, xp in entries:
+            self._xp[user_id] = xp
+        keys = sorted(_key(user_id, xp) for user_id, xp in self._xp.items())
+        self._blocks = [keys[i:i + self.BLOCK_SIZE] for i in range(0, len(keys), self.BLOCK_SIZE)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [block[-1] for block in self._blocks]
+        self._fenwick = _Fenwick([len(block) for block in self._blocks])
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._xp
+
+    def xp(self, user_id: int) -> Optional[int]:
+        return self._xp.get(user_id)
+
+    def _block_for(self, key: int) -> int:
+        return min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+
+    def _insert(self, key: int):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._rebuild()
+            return
+        i = self._block_for(key)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self._rebuild()
+        else:
+            self._fenwick.add(i, 1)
+
+    def _remove(self, key: int):
+        i = self._block_for(key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+            self._fenwick.add(i, -1)
+        else:
+            del self._blocks[i]
+            self._rebuild()
+
+    def update(self, user_id: int, xp: int):
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._remove(_key(user_id, old))
+        self._xp[user_id] = xp
+        self._insert(_key(user_id, xp))
+
+    def remove(self, user_id: int):
+        old = self._xp.pop(user_id, None)
+        if old is not None:
+            self._remove(_key(user_id, old))
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based position, ties broken by user id"""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        key = _key(user_id, xp)
+        i = self._block_for(key)
+        return self._fenwick.prefix(i) + bisect_left(self._blocks[i], key) + 1
+
+    def page(self, page: int, per_page: int = 10) -> List[Tuple[int, int]]:
+        """(user_id, xp) entries of a 1-based leaderboard page"""
+        offset = (page - 1) * per_page
+        if offset < 0 or offset >= len(self._xp):
+            return []
+        i, j = self._fenwick.find(offset)
+        entries = []
+        while i < len(self._blocks) and len(entries) < per_page:
+            entries.extend(_unpack(key) for key in self._blocks[i][j:j + per_page - len(entries)])
+            i, j = i + 1, 0
+        return entries
+
+class RankIndexCache:
+    """Lazily loaded RankIndex per guild, evicted when idle or over the entry budget"""
+
+    def __init__(self, loader: Callable[[int], Awaitable[Iterable[Tuple[int, int]]]],
+                 idle_seconds: float = 1800.0, max_entries: int = 2_000_000):
+        self.loader = loader
+        self.idle_seconds = idle_seconds
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[int, RankIndex]" = OrderedDict()
+        self._last_used: Dict[int, float] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        # Updates that arrive while a guild is loading, replayed on top of the snapshot
+        self._backlog: Dict[int, List[Tuple[int, int]]] = {}
+
+        # Metrics
+        self.loads = 0
+        self.evictions = 0
+
+    async def get(self, guild_id: int) -> RankIndex:
+        index = self._indexes.get(guild_id)
+        if index is None:
+            task = self._loading.get(guild_id)
+            if task is None:
+                self._backlog[guild_id] = []
+                task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+                task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+            index = await asyncio.shield(task)
+            if self._indexes.get(guild_id) is not index:
+                # Evicted by another guild's load while we waited; still good for this call
+                return index
+        self._indexes.move_to_end(guild_id)
+        self._last_used[guild_id] = time.monotonic()
+        return index
+
+    async def _load(self, guild_id: int) -> RankIndex:
+        start = time.perf_counter()
+        try:
+            entries = await self.loader(guild_id)
+            # Sorting a large guild takes about a second; keep it off the event loop
+            index = await asyncio.to_thread(RankIndex, entries)
+        finally:
+            backlog = self._backlog.pop(guild_id)
+        for user_id, xp in backlog:
+            index.update(user_id, xp)
+
+        self.loads += 1
+        logger.info(f"Loaded rank index for guild {guild_id}: {len(index)} members in {time.perf_counter() - start:.2f}s")
+        self._indexes[guild_id] = index
+        self._last_used[guild_id] = time.monotonic()
+        self._enforce_budget(keep=guild_id)
+        return index
+
+    def apply(self, guild_id: int, user_id: int, xp: int):
+        """Record a user's new XP total if the guild is loaded or loading"""
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            index.update(user_id, xp)
+        elif guild_id in self._backlog:
+            self._backlog[guild_id].append((user_id, xp))
+
+    def discard(self, guild_id: int):
+        if self._indexes.pop(guild_id, None) is not None:
+            self._last_used.pop(guild_id, None)
+            self.evictions += 1
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for guild_id in [g for g, used in self._last_used.items() if used < cutoff]:
+            self.discard(guild_id)
+
+    def _enforce_budget(self, keep: int):
+        total = sum(len(index) for index in self._indexes.values())
+        for guild_id in list(self._indexes):
+            if total <= self.max_entries:
+                break
+            if guild_id == keep:
+                continue
+            total -= len(self._indexes[guild_id])
+            self.discard(guild_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'guilds': len(self._indexes),
+            'entries': sum(len(index) for index in self._indexes.values()),
+            'loads': self.loads,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Longest pattern accepted anywhere, plain word or regex
+MAX_PATTERN_LENGTH = 300
+
+# Bounded repeats above this are treated like unbounded ones
+REPEAT_LIMIT = 32
+
+_REPEATS = {
+    sre_constants.MAX_REPEAT,
+    sre_constants.MIN_REPEAT,
+    getattr(sre_constants, 'POSSESSIVE_REPEAT', sre_constants.MAX_REPEAT)
+}
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+@dataclass
+class PatternAnalysis:
+    safe: bool
+    reason: Optional[str] = None
+    # Patterns with backreferences can't share a combined regex since group numbers shift
+    isolated: bool = False
+
+# Stand-ins for whole character classes when comparing what two items can match:
+# Latin-1 plus a non-Latin letter, digit, dash and space
+_SAMPLE_CHARS = frozenset(range(256)) | {0x436, 0x663, 0x2014, 0x3000}
+
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: re.compile(r'\d'),
+    sre_constants.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    sre_constants.CATEGORY_SPACE: re.compile(r'\s'),
+    sre_constants.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+    sre_constants.CATEGORY_WORD: re.compile(r'\w'),
+    sre_constants.CATEGORY_NOT_WORD: re.compile(r'\W'),
+}
+
+def _children(op, av) -> list:
+    if op in _REPEATS:
+        return [av[2]]
+    if op == sre_constants.SUBPATTERN:
+        return [av[3]]
+    if op == sre_constants.BRANCH:
+        return av[1]
+    if op == _ATOMIC_GROUP:
+        return [av]
+    if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return [av[1]]
+    if op == sre_constants.GROUPREF_EXISTS:
+        return [av[1]] + ([av[2]] if av[2] else [])
+    return []
+
+def _pattern_chars(items) -> Set[int]:
+    """Every literal and range endpoint in a parsed pattern"""
+    chars = set()
+    for op, av in items:
+        if op in (sre_constants.LITERAL, sre_constants.NOT_LITERAL):
+            chars.add(av)
+        elif op == sre_constants.IN:
+            for in_op, in_av in av:
+                if in_op == sre_constants.LITERAL:
+                    chars.add(in_av)
+                elif in_op == sre_constants.RANGE:
+                    chars.update(in_av)
+        for child in _children(op, av):
+            chars |= _pattern_chars(child)
+    return chars
+
+def _fold(chars) -> FrozenSet[int]:
+    return frozenset(ord(chr(c).lower()) for c in chars)
+
+def _char_set(op, av, alphabet: FrozenSet[int]) -> Optional[FrozenSet[int]]:
+    """Case-folded characters a single-character item can match, or None for other items"""
+    if op == sre_constants.LITERAL:
+        return _fold((av,))
+    if op == sre_constants.NOT_LITERAL:
+        return _fold(alphabet) - _fold((av,))
+    if op == sre_constants.ANY:
+        return _fold(alphabet)
+    if op != sre_constants.IN:
+        return None
+    chars = set()
+    negate = False
+    for in_op, in_av in av:
+        if in_op == sre_constants.NEGATE:
+            negate = True
+        elif in_op == sre_constants.LITERAL:
+            chars.add(in_av)
+        elif in_op == sre_constants.RANGE:
+            chars.update(c for c in alphabet if in_av[0] <= c <= in_av[1])
+        elif in_op == sre_constants.CATEGORY and in_av in _CATEGORIES:
+            chars.update(c for c in alphabet if _CATEGORIES[in_av].match(chr(c)))
+        else:
+            chars.update(alphabet)
+    return _fold(alphabet) - _fold(chars) if negate else _fold(chars)
+
+def _item_first(op, av, alphabet: FrozenSet[int]) -> Tuple[FrozenSet[int], bool]:
+    """Characters an item can start with, and whether it can match the empty string"""
+    chars = _char_set(op, av, alphabet)
+    if chars is not None:
+        return chars, False
+    if op in _REPEATS:
+        chars, nullable = _first_set(av[2], alphabet)
+        return chars, nullable or av[0] == 0
+    if op == sre_constants.SUBPATTERN:
+        return _first_set(av[3], alphabet)
+    if op == _ATOMIC_GROUP:
+        return _first_set(av, alphabet)
+    if op == sre_constants.BRANCH:
+        chars, nullable = frozenset(), False
+        for branch in av[1]:
+            branch_chars, branch_nullable = _first_set(branch, alphabet)
+            chars |= branch_chars
+            nullable = nullable or branch_nullable
+        return chars, nullable
+    if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        return frozenset(), True
+    # Backreferences and conditionals could match anything, including nothing
+    return _fold(alphabet), True
+
+def _first_set(items, alphabet: FrozenSet[int]) -> Tuple[FrozenSet[int], bool]:
+    """Characters a sequence can start with, and whether it can match the empty string"""
+    first = frozenset()
+    for op, av in items:
+        chars, nullable = _item_first(op, av, alphabet)
+        first |= chars
+        if not nullable:
+            return first, False
+    return first, True
+
+def _unbounded(av) -> bool:
+    return av[1] == sre_constants.MAXREPEAT or av[1] > REPEAT_LIMIT
+
+def _has_overlapping_branch(items, alphabet: FrozenSet[int]) -> bool:
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN:
+            if _has_overlapping_branch(av[3], alphabet):
+                return True
+        elif op == sre_constants.BRANCH:
+            seen: Set[int] = set()
+            for branch in av[1]:
+                chars, nullable = _first_set(branch, alphabet)
+                if nullable or seen & chars:
+                    return True
+                seen |= chars
+    return False
+
+def _flatten(items):
+    """Items of a sequence with groups spliced in, since they don't bound backtracking"""
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN:
+            yield from _flatten(av[3])
+        else:
+            yield op, av
+
+def _has_overlapping_repeats(items, alphabet: FrozenSet[int]) -> bool:
+    """Unbounded repeats in a row that can consume the same characters, like a*a*b:
+    each extra one multiplies the ways a failing match can split the text"""
+    # First characters of repeats that could still give text to a later one
+    open_repeats = []
+    for op, av in _flatten(items):
+        chars, nullable = _item_first(op, av, alphabet)
+        repeat = op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and _unbounded(av)
+        if repeat and any(chars & other for other in open_repeats):
+            return True
+        if not nullable:
+            # A required character a repeat can't match pins where that repeat stops
+            open_repeats = [other for other in open_repeats if other & chars]
+        if repeat:
+            open_repeats.append(chars)
+    return False
+
+def _walk(items, in_repeat: bool, alphabet: FrozenSet[int]) -> Optional[str]:
+    if _has_overlapping_repeats(items, alphabet):
+        return "adjacent quantifiers over overlapping characters"
+    for op, av in items:
+        reason = None
+        if op in _REPEATS:
+            unbounded = _unbounded(av)
+            if unbounded and in_repeat:
+                return "nested quantifiers"
+            if unbounded and _has_overlapping_branch(av[2], alphabet):
+                return "overlapping alternation inside a quantifier"
+            reason = _walk(av[2], in_repeat or unbounded, alphabet)
+        elif op == _ATOMIC_GROUP:
+            # Atomic groups never backtrack into themselves
+            reason = _walk(av, False, alphabet)
+        else:
+            for child in _children(op, av):
+                reason = reason or _walk(child, in_repeat, alphabet)
+        if reason:
+            return reason
+    return None
+
+def _uses_backrefs(items) -> bool:
+    for op, av in items:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        if any(_uses_backrefs(child) for child in _children(op, av)):
+            return True
+    return False
+
+def analyze_pattern(pattern: str) -> PatternAnalysis:
+    """Reject regexes that can backtrack catastrophically before they reach the filter"""
+    if not pattern:
+        return PatternAnalysis(False, "empty pattern")
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        return PatternAnalysis(False, f"longer than {MAX_PATTERN_LENGTH} characters")
+
+    try:
+        re.compile(pattern, re.IGNORECASE)
+        parsed = sre_parse.parse(pattern, re.IGNORECASE)
+    except (re.error, RecursionError) as e:
+        return PatternAnalysis(False, f"invalid regex: {e}")
+
+    reason = _walk(parsed, False, _SAMPLE_CHARS | _pattern_chars(parsed))
+    if reason:
+        return PatternAnalysis(False, reason)
+
+    return PatternAnalysis(True, isolated=_uses_backrefs(parsed))
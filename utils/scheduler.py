@@ -0,0 +1,135 @@
+import asyncio
+import calendar
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('discord')
+
+# Re-check the clock at least this often in case the system time jumps
+MAX_SLEEP_SECONDS = 300
+
+REPEAT_TYPES = ('daily', 'weekly', 'monthly')
+
+def add_months(start: datetime, months: int) -> datetime:
+    """Shift by whole months, clamping to the last day of shorter months"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+def next_occurrence(start: datetime, current: datetime, repeat: str,
+                    now: datetime) -> Tuple[datetime, int]:
+    """First occurrence after both `current` and `now`, plus how many were skipped on the way.
+    Monthly repeats are computed from `start` so the 31st stays the 31st after a short month."""
+    skipped = 0
+    if repeat == 'monthly':
+        months = (current.year - start.year) * 12 + current.month - start.month
+        nxt = add_months(start, months + 1)
+        while nxt <= now:
+            skipped += 1
+            months += 1
+            nxt = add_months(start, months + 1)
+        return nxt, skipped
+
+    step = timedelta(days=1) if repeat == 'daily' else timedelta(weeks=1)
+    nxt = current + step
+    if nxt <= now:
+        missed = (now - nxt) // step + 1
+        nxt += step * missed
+        skipped = missed
+    return nxt, skipped
+
+class DeadlineScheduler:
+    """Min-heap of due times that sleeps until the earliest one and fires a callback per key"""
+
+    def __init__(self, callback: Callable[[Any], Awaitable[None]],
+                 name: str = 'scheduler', max_concurrency: int = 10):
+        self.callback = callback
+        self.name = name
+        self._heap: List[Tuple[datetime, int, Any]] = []
+        self._due: Dict[Any, datetime] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._running: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._due
+
+    def due_time(self, key: Any) -> Optional[datetime]:
+        return self._due.get(key)
+
+    def schedule(self, key: Any, when: datetime):
+        """Add or move a key; the previous heap entry becomes stale and is skipped"""
+        self._due[key] = when
+        heapq.heappush(self._heap, (when, next(self._seq), key))
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+        self._maybe_compact()
+
+    def cancel(self, key: Any) -> bool:
+        return self._due.pop(key, None) is not None
+
+    def _maybe_compact(self):
+        # Lazy deletion leaves stale entries behind; rebuild once they dominate the heap
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [entry for entry in self._heap if self._due.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._running):
+            task.cancel()
+
+    async def _run(self):
+        while True:
+            # Discard entries for keys that were cancelled or rescheduled
+            while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            when = self._heap[0][0]
+            delay = (when - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._fire(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, key: Any):
+        try:
+            await self.callback(key)
+        except Exception as e:
+            logger.error(f"{self.name}: error handling {key}: {e}")
+        finally:
+            self._semaphore.release()
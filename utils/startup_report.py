@@ -0,0 +1,80 @@
+import logging
+import os
+import resource
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('discord')
+
+def current_rss() -> int:
+    """Resident set size in bytes; falls back to the peak where /proc isn't available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+@dataclass
+class CogTiming:
+    name: str
+    import_seconds: float = 0.0
+    setup_seconds: float = 0.0
+    rss_delta: int = 0
+    error: Optional[str] = None
+
+class StartupReport:
+    """Per-extension import and setup cost collected while the bot boots"""
+
+    def __init__(self):
+        self.cogs: List[CogTiming] = []
+        # Extensions inside load_extension -> (start, RSS before), until their cog is added
+        self._loading: Dict[str, tuple] = {}
+        self._added: Dict[str, tuple] = {}
+
+    def add(self, name: str) -> CogTiming:
+        timing = CogTiming(name)
+        self.cogs.append(timing)
+        return timing
+
+    def timing(self, name: str) -> CogTiming:
+        return next(timing for timing in self.cogs if timing.name == name)
+
+    def cog_added(self, cog):
+        """Called from Bot.add_cog; everything before it was importing the module and building the cog"""
+        name = type(cog).__module__
+        if name in self._loading and name not in self._added:
+            self._added[name] = (time.perf_counter(), current_rss())
+
+    async def setup_extension(self, bot, name: str) -> CogTiming:
+        """Run load_extension, which executes the module once and then setup() and cog_load"""
+        timing = self.timing(name)
+        rss_before = current_rss()
+        start = time.perf_counter()
+        self._loading[name] = (start, rss_before)
+        try:
+            await bot.load_extension(name)
+        except Exception as e:
+            timing.error = f"{type(e).__name__}: {e}"
+        end = time.perf_counter()
+        del self._loading[name]
+        added_at, rss_added = self._added.pop(name, (end, current_rss()))
+
+        timing.import_seconds = added_at - start
+        timing.setup_seconds = end - added_at
+        timing.rss_delta = rss_added - rss_before
+        return timing
+
+    def log(self):
+        logger.info("Startup report (import / setup / RSS delta of imports):")
+        for timing in sorted(self.cogs, key=lambda t: t.import_seconds + t.setup_seconds, reverse=True):
+            status = f" FAILED: {timing.error}" if timing.error else ""
+            logger.info(
+                f"  {timing.name:<24} {timing.import_seconds * 1000:8.1f}ms "
+                f"{timing.setup_seconds * 1000:8.1f}ms {timing.rss_delta / 1048576:+8.1f}MB{status}"
+            )
+        total_import = sum(t.import_seconds for t in self.cogs)
+        total_setup = sum(t.setup_seconds for t in self.cogs)
+        logger.info(f"  total: {total_import:.2f}s import, {total_setup:.2f}s setup")
@@ -0,0 +1,93 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+LEETSPEAK = {
+    '4': 'a', '@': 'a', '8': 'b', '3': 'e', '1': 'i', '0': 'o',
+    '5': 's', '7': 't', '2': 'z', '9': 'g', '6': 'g'
+}
+
+# Characters that render as nothing and are used to split up filtered words
+ZERO_WIDTH = set('\u00ad\u034f\u061c\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff')
+ZERO_WIDTH.update(chr(c) for c in range(0xfe00, 0xfe10))
+
+# Look-alike letters from other scripts that NFKD leaves alone
+CONFUSABLES = {
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o',
+    'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'ѕ': 's', 'і': 'i', 'ї': 'i',
+    'ј': 'j', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w', 'ѡ': 'w', 'ү': 'y', 'һ': 'h', 'ӏ': 'l',
+    # Greek
+    'α': 'a', 'β': 'b', 'γ': 'y', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v',
+    'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x', 'ω': 'w',
+    # Latin extensions and IPA
+    'ı': 'i', 'ȷ': 'j', 'ɑ': 'a', 'ɡ': 'g', 'ɩ': 'i', 'ʀ': 'r', 'ʏ': 'y', 'ᴀ': 'a',
+    'ʙ': 'b', 'ᴄ': 'c', 'ᴅ': 'd', 'ᴇ': 'e', 'ɢ': 'g', 'ʜ': 'h', 'ɪ': 'i', 'ᴊ': 'j',
+    'ᴋ': 'k', 'ʟ': 'l', 'ᴍ': 'm', 'ɴ': 'n', 'ᴏ': 'o', 'ᴘ': 'p', 'ꜱ': 's', 'ᴛ': 't',
+    'ᴜ': 'u', 'ᴠ': 'v', 'ᴡ': 'w', 'ᴢ': 'z', 'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o',
+    'đ': 'd', 'ħ': 'h', 'ł': 'l', 'ŧ': 't'
+}
+
+# Memoized fold results are capped so hostile input can't fill the table
+FOLD_TABLE_LIMIT = 65536
+
+def _fold_char(ch: str) -> str:
+    """Map one character to its normalized form: '' or a run of [a-z0-9 ]"""
+    if ch in ZERO_WIDTH:
+        return ''
+    if ch.isspace():
+        return ' '
+    ch = CONFUSABLES.get(ch.lower(), ch)
+    out = []
+    # Remove accents and convert to lowercase
+    for c in unicodedata.normalize('NFKD', ch):
+        if not c.isascii():
+            continue
+        c = LEETSPEAK.get(c, c).lower()
+        if c.isspace():
+            out.append(' ')
+        elif c.isalnum():
+            out.append(c)
+    return ''.join(out)
+
+class _FoldTable(dict):
+    """str.translate table that folds each code point on first sight"""
+
+    def __missing__(self, codepoint: int) -> str:
+        value = _fold_char(chr(codepoint))
+        if len(self) < FOLD_TABLE_LIMIT:
+            self[codepoint] = value
+        return value
+
+# Latin, Latin-1 and Latin Extended are folded up front
+FOLD_TABLE = _FoldTable((c, _fold_char(chr(c))) for c in range(0x250))
+
+# Every ASCII character folds to at most one character, which lets
+# str.translate take its ASCII fast path (deletions must be None for that)
+ASCII_TABLE = {c: FOLD_TABLE[c] or None for c in range(128)}
+
+# Deleting each character that is followed by itself collapses runs
+# without calling back into Python for a replacement template
+_REPEATS = re.compile(r'(.)(?=\1)')
+
+@lru_cache(maxsize=4096)
+def normalize(text: str) -> str:
+    """Fold leetspeak, look-alikes and zero-width characters, then collapse repeats"""
+    folded = text.translate(ASCII_TABLE if text.isascii() else FOLD_TABLE)
+    return _REPEATS.sub('', folded)
+
+def offset_map(text: str) -> List[int]:
+    """Index in the original text of every character of normalize(text)"""
+    out_last = ''
+    offsets = []
+    for i, ch in enumerate(text):
+        for c in FOLD_TABLE[ord(ch)]:
+            if c == out_last:
+                continue
+            out_last = c
+            offsets.append(i)
+    return offsets
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    return normalize(text), offset_map(text)
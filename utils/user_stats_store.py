@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, Optional, Set, Tuple
+
+logger = logging.getLogger('discord')
+
+class UserStatsStore:
+    """Per-user message counts kept in memory and persisted incrementally to SQLite"""
+
+    def __init__(self, path: str = 'data/user_stats.db',
+                 legacy_path: str = 'data/user_stats.json',
+                 flush_interval: float = 30.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.flush_interval = flush_interval
+        self.stats: Dict[str, Dict[str, dict]] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL keeps each batch atomic and durable without rewriting the whole file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_stats (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                last_active TEXT,
+                join_date TEXT,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+        conn.commit()
+        return conn
+
+    def _load(self):
+        self._conn = self._open()
+        rows = self._conn.execute(
+            "SELECT guild_id, user_id, message_count, last_active, join_date FROM user_stats"
+        ).fetchall()
+
+        if not rows and os.path.exists(self.legacy_path):
+            self._import_legacy()
+            return
+
+        for guild_id, user_id, message_count, last_active, join_date in rows:
+            self.stats.setdefault(str(guild_id), {})[str(user_id)] = {
+                "message_count": message_count,
+                "last_active": last_active,
+                "join_date": join_date
+            }
+
+    def _import_legacy(self):
+        """One-time migration from the old data/user_stats.json file"""
+        with open(self.legacy_path, 'r') as f:
+            self.stats = json.load(f)
+        self._write([
+            (guild_id, user_id, data)
+            for guild_id, users in self.stats.items()
+            for user_id, data in users.items()
+        ])
+        logger.info(f"Imported legacy user stats from {self.legacy_path}")
+
+    async def load(self):
+        await asyncio.to_thread(self._load)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    def get(self, guild_id: int, user_id: int) -> Optional[dict]:
+        return self.stats.get(str(guild_id), {}).get(str(user_id))
+
+    def record_message(self, guild_id: int, user_id: int, when: str,
+                       join_date: Optional[str] = None):
+        """O(1) in-memory update; persistence happens on the next flush"""
+        guild_key, user_key = str(guild_id), str(user_id)
+        users = self.stats.setdefault(guild_key, {})
+        entry = users.get(user_key)
+        if entry is None:
+            entry = users[user_key] = {
+                "message_count": 0,
+                "last_active": None,
+                "join_date": join_date
+            }
+        entry["message_count"] += 1
+        entry["last_active"] = when
+        self._dirty.add((guild_key, user_key))
+
+    def _write(self, rows):
+        with self._conn:
+            self._conn.executemany("""
+                INSERT INTO user_stats (guild_id, user_id, message_count, last_active, join_date)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                    message_count = excluded.message_count,
+                    last_active = excluded.last_active,
+                    join_date = excluded.join_date
+            """, [
+                (int(guild_id), int(user_id), data["message_count"],
+                 data["last_active"], data["join_date"])
+                for guild_id, user_id, data in rows
+            ])
+
+    async def flush(self):
+        """Persist only the users touched since the last flush"""
+        if not self._dirty or self._conn is None:
+            return
+
+        async with self._write_lock:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                (guild_id, user_id, dict(self.stats[guild_id][user_id]))
+                for guild_id, user_id in dirty
+            ]
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except asyncio.CancelledError:
+                self._dirty |= dirty
+                raise
+            except Exception as e:
+                logger.error(f"Failed to persist {len(rows)} user stats: {e}")
+                self._dirty |= dirty
+
+    async def close(self):
+        # Stop the loop cooperatively so an in-progress flush finishes its write
+        # before the final flush and before the connection is closed under it
+        self._stopping.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._conn:
+            self._conn.close()
+            self._conn = None
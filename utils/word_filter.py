@@ -1,12 +1,41 @@
 import re
-import unicodedata
+import time
+import asyncio
+import itertools
+from concurrent.futures import Executor
+from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import logging
 from dataclasses import dataclass
 from better_profanity import Profanity
+from utils.aho_corasick import AhoCorasick
+from utils.regex_safety import analyze_pattern
+from utils.text_normalizer import normalize, offset_map
+from utils.pattern_cache import PatternCache
+from utils.metrics import LatencyTracker
 
 logger = logging.getLogger('discord')
 
+# Simple patterns either match whole words or anywhere inside the text
+MATCH_MODES = ('word', 'substring')
+
+# Regex patterns are OR-ed together into combined scans of this many alternatives
+REGEX_CHUNK_SIZE = 100
+
+# A scan slower than this (or than the per-character allowance for long messages)
+# gets its group split up; a lone pattern is quarantined after several slow scans in a row
+SLOW_REGEX_SECONDS = 0.01
+SLOW_REGEX_SECONDS_PER_CHAR = 0.000005
+SLOW_SCAN_STRIKES = 3
+
+# Total regex time allowed per message before the remaining scans are skipped
+MESSAGE_REGEX_BUDGET = 0.05
+
+# Guilds with at least this many patterns are matched in a worker process
+OFFLOAD_PATTERN_THRESHOLD = 2000
+
+PATTERN_FIELDS = ('pattern', 'regex_pattern', 'is_regex', 'category', 'severity', 'match_mode')
+
 @dataclass
 class FilterMatch:
     pattern: str
@@ -15,93 +44,340 @@ class FilterMatch:
     index: int
     matched_text: str
 
+@dataclass
+class PatternInfo:
+    pattern: str
+    category: str
+    severity: int
+    match_mode: str = 'word'
+
+@dataclass
+class RegexGroup:
+    compiled: re.Pattern
+    members: List[PatternInfo]
+    slow_scans: int = 0
+
+class PatternSet:
+    """Compiled matcher for one guild's filter patterns"""
+
+    def __init__(self, patterns, quarantined: Optional[Dict[str, str]] = None):
+        quarantined = quarantined or {}
+        # Plain, picklable copy of the inputs so a worker process can rebuild this set
+        self.spec = (
+            [{field: pattern.get(field) for field in PATTERN_FIELDS} for pattern in patterns],
+            dict(quarantined)
+        )
+        self.generation = 0
+        self.automaton = AhoCorasick()
+        self.regex_groups: List[RegexGroup] = []
+        # (pattern, reason) pairs found while loading or scanning, drained by the filter
+        self.quarantined: List[Tuple[str, str]] = []
+        self.budget_overruns = 0
+
+        combinable = []
+        isolated = []
+        for pattern in patterns:
+            if pattern['is_regex']:
+                source = pattern['regex_pattern']
+                if source in quarantined:
+                    continue
+                analysis = analyze_pattern(source)
+                if not analysis.safe:
+                    self.quarantined.append((source, analysis.reason))
+                    continue
+                info = PatternInfo(
+                    pattern=source,
+                    category=pattern['category'],
+                    severity=pattern['severity']
+                )
+                (isolated if analysis.isolated else combinable).append(info)
+            else:
+                # Patterns go through the same normalization as messages
+                key = normalize(pattern['pattern']).strip()
+                if not key:
+                    continue
+                match_mode = pattern.get('match_mode') or 'word'
+                self.automaton.add(key, PatternInfo(
+                    pattern=pattern['pattern'],
+                    category=pattern['category'],
+                    severity=pattern['severity'],
+                    match_mode=match_mode if match_mode in MATCH_MODES else 'word'
+                ))
+        self.automaton.build()
+
+        self.pattern_count = len(self.automaton) + len(combinable) + len(isolated)
+
+        # Leftmost alternative wins on overlap, so put the most severe patterns first
+        combinable.sort(key=lambda info: info.severity, reverse=True)
+        for i in range(0, len(combinable), REGEX_CHUNK_SIZE):
+            self._add_regex_group(combinable[i:i + REGEX_CHUNK_SIZE])
+        for info in isolated:
+            self._add_regex_group([info])
+
+    @property
+    def estimated_size(self) -> int:
+        """Rough memory footprint in bytes, used for cache accounting"""
+        automaton_bytes = self.automaton.node_count * 120 + len(self.automaton) * 200
+        regex_bytes = sum(
+            2048 + sum(len(info.pattern) * 32 + 200 for info in group.members)
+            for group in self.regex_groups
+        )
+        return automaton_bytes + regex_bytes
+
+    def _add_regex_group(self, members: List[PatternInfo]):
+        if len(members) == 1:
+            self.regex_groups.append(RegexGroup(
+                re.compile(members[0].pattern, re.IGNORECASE), members
+            ))
+            return
+
+        combinable = []
+        for info in members:
+            try:
+                # Inline global flags like (?i) are only legal at the very start
+                re.compile(f"(?P<p0>{info.pattern})")
+                combinable.append(info)
+            except re.error:
+                self._add_regex_group([info])
+        if not combinable:
+            return
+
+        combined = '|'.join(f"(?P<p{i}>{info.pattern})" for i, info in enumerate(combinable))
+        try:
+            compiled = re.compile(combined, re.IGNORECASE)
+        except re.error:
+            # e.g. duplicate group names across patterns; fall back to separate scans
+            for info in combinable:
+                self._add_regex_group([info])
+            return
+        self.regex_groups.append(RegexGroup(compiled, combinable))
+
+    def _handle_slow_group(self, group: RegexGroup, elapsed: float):
+        if len(group.members) > 1:
+            # Split so the next slow scans pin down the culprit
+            self.regex_groups.remove(group)
+            for info in group.members:
+                self._add_regex_group([info])
+            return
+
+        # One slow scan can be a GC pause or a busy worker; only a streak disables a rule
+        group.slow_scans += 1
+        if group.slow_scans >= SLOW_SCAN_STRIKES:
+            self.regex_groups.remove(group)
+            self.quarantined.append((
+                group.members[0].pattern,
+                f"took {elapsed * 1000:.1f}ms, {group.slow_scans} slow scans in a row"
+            ))
+
+    def scan_regex(self, normalized: str) -> List[Tuple[int, int, str, str, int]]:
+        spans = []
+        spent = 0.0
+        slow_after = max(SLOW_REGEX_SECONDS, len(normalized) * SLOW_REGEX_SECONDS_PER_CHAR)
+        for group in list(self.regex_groups):
+            if spent > MESSAGE_REGEX_BUDGET:
+                self.budget_overruns += 1
+                logger.warning(
+                    f"Regex budget exceeded after {spent * 1000:.1f}ms, "
+                    f"skipped remaining filter patterns for this message"
+                )
+                break
+
+            start = time.perf_counter()
+            for match in group.compiled.finditer(normalized):
+                if match.start() == match.end():
+                    continue
+                info = group.members[int(match.lastgroup[1:])] if match.lastgroup else group.members[0]
+                spans.append((
+                    match.start(), match.end(), match.group(),
+                    info.category, info.severity
+                ))
+            elapsed = time.perf_counter() - start
+            spent += elapsed
+
+            if elapsed > slow_after:
+                self._handle_slow_group(group, elapsed)
+            else:
+                group.slow_scans = 0
+
+        return spans
+
+    def scan(self, normalized: str) -> List[Tuple[int, int, str, str, int]]:
+        """Return (start, end, pattern, category, severity) spans in the normalized text"""
+        spans = self.scan_regex(normalized)
+
+        length = len(normalized)
+        for start, end, info in self.automaton.iter_matches(normalized):
+            if info.match_mode == 'word' and (
+                (start > 0 and normalized[start - 1] != ' ') or
+                (end < length and normalized[end] != ' ')
+            ):
+                continue
+            spans.append((start, end, info.pattern, info.category, info.severity))
+
+        return spans
+
 class EnhancedWordFilter:
-    def __init__(self, db):
+    def __init__(self, db, max_guilds: int = 500, max_bytes: int = 256 * 1024 * 1024,
+                 executor: Optional[Executor] = None,
+                 offload_threshold: int = OFFLOAD_PATTERN_THRESHOLD):
         self.db = db
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self.latency = LatencyTracker()
+        self._generations = itertools.count(1)
         self.profanity = Profanity()
         self.cache = {}
-        self.pattern_cache = {}
-        self.regex_patterns = {}
-        
-    async def load_patterns(self, guild_id: int):
+        self.pattern_cache = PatternCache(
+            max_guilds=max_guilds,
+            max_bytes=max_bytes,
+            on_evict=self.latency.discard
+        )
+        # guild_id -> {regex: reason} for patterns kept out of the matcher
+        self.quarantined: Dict[int, Dict[str, str]] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._versions_seen_at: Optional[datetime] = None
+
+    async def load_patterns(self, guild_id: int) -> PatternSet:
         """Load or refresh patterns for a guild"""
+        # Read the version first so a concurrent change leaves us stale rather than wrong
+        version = await self.db.get_filter_pattern_version(guild_id)
         patterns = await self.db.get_filter_patterns(guild_id)
-        
-        self.pattern_cache[guild_id] = {
-            'regex': [],
-            'simple': set(),
-            'categories': {}
-        }
-        
-        for pattern in patterns:
-            if pattern['is_regex']:
-                try:
-                    compiled = re.compile(pattern['regex_pattern'], re.IGNORECASE)
-                    self.pattern_cache[guild_id]['regex'].append({
-                        'pattern': compiled,
-                        'category': pattern['category'],
-                        'severity': pattern['severity']
-                    })
-                except re.error:
-                    logger.error(f"Invalid regex pattern: {pattern['regex_pattern']}")
-            else:
-                self.pattern_cache[guild_id]['simple'].add(pattern['pattern'].lower())
-                self.pattern_cache[guild_id]['categories'][pattern['pattern'].lower()] = {
-                    'category': pattern['category'],
-                    'severity': pattern['severity']
-                }
+        pattern_set = PatternSet(patterns, self.quarantined.get(guild_id))
+        pattern_set.generation = next(self._generations)
+        self._collect_quarantined(guild_id, pattern_set)
+        self.pattern_cache.put(guild_id, pattern_set, version, pattern_set.estimated_size)
+        return pattern_set
+
+    async def get_patterns(self, guild_id: int) -> PatternSet:
+        """Cached pattern set for a guild, loaded lazily and at most once concurrently"""
+        entry = self.pattern_cache.get(guild_id)
+        if entry:
+            return entry.value
+
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(self.load_patterns(guild_id))
+            self._loading[guild_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(task)
+
+    async def patterns_changed(self, guild_id: int):
+        """Publish a pattern change to every bot process and reload locally"""
+        await self.db.bump_filter_pattern_version(guild_id)
+        await self.load_patterns(guild_id)
+
+    async def poll_invalidations(self):
+        """Mark cached guilds stale when another process changed their patterns"""
+        rows = await self.db.get_filter_pattern_versions_since(self._versions_seen_at)
+        for row in rows:
+            if self.pattern_cache.mark_stale(row['guild_id'], row['version']):
+                logger.info(f"Filter patterns for guild {row['guild_id']} changed, reloading lazily")
+            if self._versions_seen_at is None or row['updated_at'] > self._versions_seen_at:
+                self._versions_seen_at = row['updated_at']
+
+    def _collect_quarantined(self, guild_id: int, pattern_set: PatternSet):
+        while pattern_set.quarantined:
+            pattern, reason = pattern_set.quarantined.pop()
+            self.quarantined.setdefault(guild_id, {})[pattern] = reason
+            logger.warning(f"Quarantined filter pattern in guild {guild_id}: {pattern!r} ({reason})")
+
+    def release_quarantined(self, guild_id: int, pattern: Optional[str] = None) -> int:
+        """Re-enable one quarantined pattern, or all of a guild's; returns how many were released"""
+        quarantined = self.quarantined.get(guild_id, {})
+        if pattern is None:
+            released = len(quarantined)
+            self.quarantined.pop(guild_id, None)
+        else:
+            released = 1 if quarantined.pop(pattern, None) is not None else 0
+        if released:
+            # Rebuilt lazily; patterns the static analysis rejects are quarantined again
+            self.pattern_cache.discard(guild_id)
+        return released
+
+    def forget_guild(self, guild_id: int):
+        """Drop everything held for a guild the bot has left"""
+        self.pattern_cache.discard(guild_id)
+        self.latency.discard(guild_id)
+        self.quarantined.pop(guild_id, None)
 
     def normalize_text(self, text: str) -> str:
         """Advanced text normalization"""
-        # Remove accents and convert to lowercase
-        text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode()
-        
-        # Replace common leetspeak
-        leetspeak = {
-            '4': 'a', '@': 'a', '8': 'b', '3': 'e', '1': 'i', '0': 'o',
-            '5': 's', '7': 't', '2': 'z', '9': 'g', '6': 'g'
-        }
-        for k, v in leetspeak.items():
-            text = text.replace(k, v)
-            
-        # Remove repeating characters
-        text = re.sub(r'(.)\1+', r'\1', text)
-        
-        # Remove non-alphanumeric characters
-        text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-        
-        return text.lower()
+        return normalize(text)
 
     async def check_message(self, guild_id: int, content: str) -> List[FilterMatch]:
         """Check message for filter violations"""
-        if guild_id not in self.pattern_cache:
-            await self.load_patterns(guild_id)
-            
-        matches = []
-        normalized = self.normalize_text(content)
-        words = normalized.split()
-        
-        # Check regex patterns
-        for regex_data in self.pattern_cache[guild_id]['regex']:
-            for match in regex_data['pattern'].finditer(normalized):
-                matches.append(FilterMatch(
-                    pattern=match.group(),
-                    category=regex_data['category'],
-                    severity=regex_data['severity'],
-                    index=match.start(),
-                    matched_text=content[match.start():match.end()]
-                ))
-        
-        # Check simple patterns
-        for i, word in enumerate(words):
-            if word in self.pattern_cache[guild_id]['simple']:
-                cat_data = self.pattern_cache[guild_id]['categories'][word]
-                matches.append(FilterMatch(
-                    pattern=word,
-                    category=cat_data['category'],
-                    severity=cat_data['severity'],
-                    index=normalized.find(word),
-                    matched_text=word
-                ))
-        
-        return matches 
\ No newline at end of file
+        pattern_set = await self.get_patterns(guild_id)
+
+        start = time.perf_counter()
+        if self.executor and pattern_set.pattern_count >= self.offload_threshold:
+            matches = await self._check_offloaded(guild_id, pattern_set, content)
+        else:
+            matches = find_matches(pattern_set, content)
+            if pattern_set.quarantined:
+                self._collect_quarantined(guild_id, pattern_set)
+        self.latency.record(guild_id, time.perf_counter() - start)
+
+        return matches
+
+    async def _check_offloaded(self, guild_id: int, pattern_set: PatternSet,
+                               content: str) -> List[FilterMatch]:
+        loop = asyncio.get_running_loop()
+        key = (guild_id, pattern_set.generation)
+        # Workers keep compiled sets by key, so the spec is only shipped on a miss
+        result = await loop.run_in_executor(self.executor, scan_in_worker, key, content, None)
+        if result is None:
+            result = await loop.run_in_executor(
+                self.executor, scan_in_worker, key, content, pattern_set.spec
+            )
+
+        matches, quarantined = result
+        if quarantined:
+            pattern_set.quarantined.extend(quarantined)
+            self._collect_quarantined(guild_id, pattern_set)
+            # Rebuild without the quarantined patterns under a new generation
+            self.pattern_cache.discard(guild_id)
+        return matches
+
+def find_matches(pattern_set: PatternSet, content: str) -> List[FilterMatch]:
+    """Scan content with a compiled pattern set and map spans back to the original text"""
+    spans = pattern_set.scan(normalize(content))
+    if not spans:
+        return []
+
+    # Only messages that matched pay for the offset map
+    offsets = offset_map(content)
+    matches = []
+    for start, end, pattern, category, severity in spans:
+        # Map the normalized span back onto the original content
+        original_start = offsets[start]
+        original_end = offsets[end - 1] + 1
+        matches.append(FilterMatch(
+            pattern=pattern,
+            category=category,
+            severity=severity,
+            index=original_start,
+            matched_text=content[original_start:original_end]
+        ))
+
+    return matches
+
+# Compiled pattern sets held by each worker process, keyed by (guild_id, generation)
+_worker_sets: Dict[Tuple[int, int], PatternSet] = {}
+WORKER_CACHE_SIZE = 32
+
+def scan_in_worker(key: Tuple[int, int], content: str, spec=None):
+    """Process pool entry point; returns None when the worker needs the spec first"""
+    pattern_set = _worker_sets.pop(key, None)
+    if pattern_set is None:
+        if spec is None:
+            return None
+        pattern_set = PatternSet(*spec)
+        pattern_set.quarantined.clear()
+    _worker_sets[key] = pattern_set
+    while len(_worker_sets) > WORKER_CACHE_SIZE:
+        del _worker_sets[next(iter(_worker_sets))]
+
+    matches = find_matches(pattern_set, content)
+    quarantined = list(pattern_set.quarantined)
+    pattern_set.quarantined.clear()
+    return matches, quarantined
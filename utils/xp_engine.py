@@ -0,0 +1,116 @@
+import random
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+XP_COOLDOWN = 60.0
+XP_PER_MESSAGE = (15, 25)
+MAX_LEVEL = 1000
+
+def xp_to_next_level(level: int) -> int:
+    return 5 * level ** 2 + 50 * level + 100
+
+def _build_curve(max_level: int) -> List[int]:
+    thresholds = [0]
+    for level in range(max_level):
+        thresholds.append(thresholds[-1] + xp_to_next_level(level))
+    return thresholds
+
+# LEVEL_THRESHOLDS[n] is the total XP needed to reach level n
+LEVEL_THRESHOLDS = _build_curve(MAX_LEVEL)
+
+def level_for_xp(xp: int) -> int:
+    return bisect_right(LEVEL_THRESHOLDS, xp) - 1
+
+def advance_level(level: int, xp: int) -> int:
+    """Level for `xp` starting from a known lower level; O(1) unless levels are skipped"""
+    while level < MAX_LEVEL and xp >= LEVEL_THRESHOLDS[level + 1]:
+        level += 1
+    return level
+
+class PendingXP:
+    __slots__ = ('xp', 'messages', 'last_message_at', 'channel_id')
+
+    def __init__(self):
+        self.xp = 0
+        self.messages = 0
+        self.last_message_at = 0.0
+        self.channel_id: Optional[int] = None
+
+class XPEngine:
+    """Cooldown-gated XP awards accumulated per user until the next flush"""
+
+    def __init__(self, cooldown: float = XP_COOLDOWN, xp_range: Tuple[int, int] = XP_PER_MESSAGE,
+                 rng: Optional[random.Random] = None):
+        self.cooldown = cooldown
+        self.xp_range = xp_range
+        self._randint = (rng or random.Random()).randint
+        # Two generations of last-award times: anything not in either is older than
+        # one cooldown, so the map never holds more than ~2 cooldowns of active users
+        self._cooldowns: Dict[Tuple[int, int], float] = {}
+        self._previous: Dict[Tuple[int, int], float] = {}
+        self._rotated_at: Optional[float] = None
+        self.pending: Dict[Tuple[int, int], PendingXP] = {}
+
+        # Metrics
+        self.messages_seen = 0
+        self.awards = 0
+
+    def _rotate(self, now: float):
+        if self._rotated_at is None:
+            self._rotated_at = now
+        elif now - self._rotated_at >= self.cooldown:
+            self._previous = self._cooldowns
+            self._cooldowns = {}
+            self._rotated_at = now
+
+    def award(self, guild_id: int, user_id: int, channel_id: Optional[int] = None,
+              now: Optional[float] = None) -> int:
+        """XP granted for one message, or 0 while the user is on cooldown"""
+        now = time.monotonic() if now is None else now
+        self.messages_seen += 1
+        self._rotate(now)
+
+        key = (guild_id, user_id)
+        last = self._cooldowns.get(key)
+        if last is None:
+            last = self._previous.get(key)
+        if last is not None and now - last < self.cooldown:
+            return 0
+
+        self._cooldowns[key] = now
+        amount = self._randint(*self.xp_range)
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = self.pending[key] = PendingXP()
+        entry.xp += amount
+        entry.messages += 1
+        entry.last_message_at = time.time()
+        entry.channel_id = channel_id
+        self.awards += 1
+        return amount
+
+    def drain(self) -> Dict[Tuple[int, int], PendingXP]:
+        """Take everything accumulated since the last drain"""
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def restore(self, pending: Dict[Tuple[int, int], PendingXP]):
+        """Merge back a drained batch whose flush failed"""
+        for key, old in pending.items():
+            entry = self.pending.get(key)
+            if entry is None:
+                self.pending[key] = old
+                continue
+            entry.xp += old.xp
+            entry.messages += old.messages
+            entry.last_message_at = max(entry.last_message_at, old.last_message_at)
+            entry.channel_id = entry.channel_id or old.channel_id
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'messages_seen': self.messages_seen,
+            'awards': self.awards,
+            'pending_users': len(self.pending),
+            'cooldown_entries': len(self._cooldowns) + len(self._previous)
+        }